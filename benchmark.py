@@ -0,0 +1,316 @@
+import argparse
+import json
+import os
+import platform
+import random
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from datetime import datetime, timezone
+
+from build_graph import components_section, statistics_section, write_graph
+from closure import ClosureIndex
+from course_graph import CourseGraph
+from graph_formats import write_binary
+from metrics import max_rss_bytes
+from scraper import extract_courses_from_text
+from search_index import SearchIndex
+
+DEFAULT_SIZES = (100, 10000, 100000)
+DEFAULT_STAGES = ('parse', 'graph', 'components', 'stats', 'json', 'binary')
+OPTIONAL_STAGES = ('closure', 'search', 'layout')
+# A run slower than the baseline by more than this fraction is a regression
+DEFAULT_THRESHOLD = 0.2
+
+_LETTERS = 'ABCDEFGHIJKLMNOPQRSTUVWXYZ'
+_TITLE_WORDS = ('Linear Algebra Calculus Analysis Topology Geometry Number Theory Statistics '
+                'Probability Computing Systems Software Design Data Structures Algorithms Networks '
+                'Security Logic Differential Equations Optimization Inference Regression Learning '
+                'Introduction Advanced Topics Methods Applied Discrete Numerical Abstract').split()
+
+
+def synthetic_calendar(course_count, seed=0):
+    """Calendar text for `course_count` courses, as {subject: text} for extract_courses_from_text.
+
+    Subjects hold up to 400 courses numbered 100-499. Each course above the
+    100 level lists up to four lower-numbered prerequisites, mostly from its
+    own subject, picked in proportion to how many courses already require
+    them, so a few hub courses gather most of the follow-ups as in the real
+    calendar. Some prerequisites are written as "A or B" alternatives, and
+    about one in fifty names a course outside the calendar.
+    """
+    rng = random.Random(seed)
+    subject_count = max(1, -(-course_count // 400))
+    subjects = []
+    seen = set()
+    while len(subjects) < subject_count:
+        subject = ''.join(rng.choice(_LETTERS) for _ in range(4))
+        if subject not in seen:
+            seen.add(subject)
+            subjects.append(subject)
+
+    # Course numbers per subject, spread over the four levels
+    per_subject = [course_count // subject_count + (s < course_count % subject_count)
+                   for s in range(subject_count)]
+    # Codes drawn once per existing follow-up, for preferential attachment
+    chosen = {subject: [] for subject in subjects}
+    listed = {subject: [] for subject in subjects}
+    lines = {subject: [] for subject in subjects}
+
+    for s, subject in enumerate(subjects):
+        numbers = sorted(rng.sample(range(100, 500), per_subject[s]))
+        for number in numbers:
+            code = f'{subject} {number}'
+            units = rng.choice(('3.00', '3.00', '3.00', '6.00'))
+            title = ' '.join(rng.sample(_TITLE_WORDS, rng.randint(1, 4)))
+            lines[subject].append(f'{code}  {title}  Units: {units}')
+            lines[subject].append(f'An overview of {title.lower()}.')
+
+            prereqs = []
+            if number >= 200:
+                for _ in range(rng.choice((0, 1, 1, 1, 2, 2, 3, 4))):
+                    pool_subject = subject if rng.random() < 0.8 or s == 0 else subjects[rng.randrange(s)]
+                    pool = listed[pool_subject]
+                    if not pool:
+                        continue
+                    weighted = chosen[pool_subject]
+                    if weighted and rng.random() < 0.7:
+                        prereq = rng.choice(weighted)
+                    else:
+                        prereq = rng.choice(pool)
+                    if prereq in prereqs or int(prereq[5:]) >= number:
+                        continue
+                    prereqs.append(prereq)
+                if prereqs and rng.random() < 0.02:
+                    prereqs.append(f'ZZZZ {rng.randrange(100, 500)}')
+
+            if prereqs:
+                for prereq in prereqs:
+                    if prereq[:4] in chosen:
+                        chosen[prereq[:4]].append(prereq)
+                clause = prereqs[0]
+                for prereq in prereqs[1:]:
+                    clause += (' or ' if rng.random() < 0.2 else ' and ') + prereq
+                lines[subject].append(f'Prerequisite {clause}.')
+                if rng.random() < 0.1:
+                    lines[subject].append(f'Exclusion {subject} {rng.randrange(100, 500)}.')
+            listed[subject].append(code)
+
+    return {subject: '\n'.join(lines[subject]) + '\n' for subject in subjects}
+
+
+def _stage_parse(state):
+    courses = []
+    for subject, text in state['calendar'].items():
+        courses.extend(extract_courses_from_text(text, subject))
+    state['courses'] = courses
+
+
+def _stage_graph(state):
+    state['graph'] = CourseGraph(state['courses'])
+
+
+def _stage_components(state):
+    graph = state['graph']
+    state['components'] = graph.components()
+    state['isolated'] = graph.isolated(state['components'])
+
+
+def _stage_stats(state):
+    graph = state['graph']
+    graph.subject_stats(state['isolated'])
+    state['section'] = components_section(graph, state['components'], state['isolated'])
+    state['statistics'] = statistics_section(len(graph), graph.edge_count, state['section'])
+
+
+def _stage_json(state):
+    graph = state['graph']
+    write_graph('json', graph.iter_nodes(), graph.iter_edges(), state['section'],
+                state['statistics'], state['out_dir'])
+
+
+def _stage_binary(state):
+    write_binary(os.path.join(state['out_dir'], 'graph.bin'), state['graph'], state['components'])
+
+
+def _stage_closure(state):
+    ClosureIndex.build(state['graph'])
+
+
+def _stage_search(state):
+    SearchIndex.build(state['graph'].nodes())
+
+
+def _stage_layout(state):
+    # NumPy is only needed for this stage
+    from layout import layout
+    layout(state['graph'])
+
+
+# Stage whose output each stage reads
+REQUIRES = {
+    'graph': 'parse',
+    'components': 'graph',
+    'stats': 'components',
+    'json': 'stats',
+    'binary': 'components',
+    'closure': 'graph',
+    'search': 'graph',
+    'layout': 'graph',
+}
+
+STAGES = {
+    'parse': _stage_parse,
+    'graph': _stage_graph,
+    'components': _stage_components,
+    'stats': _stage_stats,
+    'json': _stage_json,
+    'binary': _stage_binary,
+    'closure': _stage_closure,
+    'search': _stage_search,
+    'layout': _stage_layout,
+}
+
+
+def with_requirements(stages):
+    """`stages` plus every stage they depend on, in pipeline order"""
+    needed = set()
+    for name in stages:
+        while name is not None and name not in needed:
+            needed.add(name)
+            name = REQUIRES.get(name)
+    return [name for name in STAGES if name in needed]
+
+
+def run_pipeline(calendar, stages, out_dir, traced=False):
+    """Run `stages` in order; returns {stage: seconds} or, if `traced`, {stage: peak bytes}.
+
+    Peak memory is what a stage allocates above what was live when it
+    started, measured with tracemalloc (which slows the run down, so traced
+    and timed passes are separate).
+    """
+    state = {'calendar': calendar, 'out_dir': out_dir}
+    results = {}
+    for name in stages:
+        stage = STAGES[name]
+        if traced:
+            tracemalloc.start()
+            base = tracemalloc.get_traced_memory()[0]
+            stage(state)
+            results[name] = tracemalloc.get_traced_memory()[1] - base
+            tracemalloc.stop()
+        else:
+            start = time.perf_counter()
+            stage(state)
+            results[name] = time.perf_counter() - start
+    return results, state
+
+
+def benchmark_size(course_count, stages, repeat, seed=0):
+    """Timings (best of `repeat`) and peak memory of every stage at one calendar size"""
+    calendar = synthetic_calendar(course_count, seed)
+    runs = {name: [] for name in stages}
+    with tempfile.TemporaryDirectory() as out_dir:
+        for _ in range(repeat):
+            seconds, state = run_pipeline(calendar, stages, out_dir)
+            for name, value in seconds.items():
+                runs[name].append(value)
+        peaks, _ = run_pipeline(calendar, stages, out_dir, traced=True)
+
+    result = {'courses': course_count, 'stages': {}}
+    if 'graph' in state:
+        result['nodes'] = len(state['graph'])
+        result['edges'] = state['graph'].edge_count
+        result['dropped_prerequisites'] = state['graph'].dropped_prerequisites
+    for name in stages:
+        result['stages'][name] = {
+            'seconds': min(runs[name]),
+            'runs': runs[name],
+            'peak_bytes': peaks[name],
+        }
+    result['total_seconds'] = sum(stage['seconds'] for stage in result['stages'].values())
+    return result
+
+
+def git_commit():
+    try:
+        return subprocess.run(['git', 'rev-parse', 'HEAD'], capture_output=True, text=True,
+                              cwd=os.path.dirname(os.path.abspath(__file__)), check=True).stdout.strip()
+    except (OSError, subprocess.CalledProcessError):
+        return None
+
+
+def print_result(result):
+    print(f"\n{result['courses']} courses ({result.get('nodes', '?')} nodes, {result.get('edges', '?')} edges):")
+    for name, stage in result['stages'].items():
+        print(f"  {name:<11} {stage['seconds'] * 1000:10.1f} ms  peak {stage['peak_bytes'] / 2**20:8.1f} MiB")
+    print(f"  {'total':<11} {result['total_seconds'] * 1000:10.1f} ms")
+
+
+def compare(report, baseline, threshold):
+    """Print per-stage ratios against a previous report; returns the regressions"""
+    previous = {result['courses']: result for result in baseline['results']}
+    regressions = []
+    print(f"\nCompared with {baseline.get('commit') or 'baseline'}:")
+    for result in report['results']:
+        old = previous.get(result['courses'])
+        if old is None:
+            continue
+        for name, stage in result['stages'].items():
+            if name not in old['stages']:
+                continue
+            ratio = stage['seconds'] / max(old['stages'][name]['seconds'], 1e-9)
+            flag = ''
+            if ratio > 1 + threshold:
+                flag = '  REGRESSION'
+                regressions.append((result['courses'], name, ratio))
+            print(f"  {result['courses']:>7} {name:<11} {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark the scrape -> build pipeline on synthetic calendars')
+    parser.add_argument('--sizes', type=int, nargs='+', default=list(DEFAULT_SIZES),
+                        help='calendar sizes in courses (default: 100 10000 100000)')
+    parser.add_argument('--stages', nargs='+', choices=list(STAGES), default=list(DEFAULT_STAGES),
+                        help=f"stages to run in order (default: {' '.join(DEFAULT_STAGES)}; "
+                             f"also available: {' '.join(OPTIONAL_STAGES)})")
+    parser.add_argument('--repeat', type=int, default=3, help='timed runs per size, best is kept (default: 3)')
+    parser.add_argument('--seed', type=int, default=0, help='synthetic calendar seed (default: 0)')
+    parser.add_argument('--output', default='benchmark.json', help='results file (default: benchmark.json)')
+    parser.add_argument('--compare', metavar='BASELINE', help='previous results file to compare against')
+    parser.add_argument('--threshold', type=float, default=DEFAULT_THRESHOLD,
+                        help='slowdown fraction reported as a regression (default: 0.2)')
+    args = parser.parse_args(argv)
+
+    stage_order = with_requirements(args.stages)
+    report = {
+        'commit': git_commit(),
+        'timestamp': datetime.now(timezone.utc).isoformat(timespec='seconds'),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'repeat': args.repeat,
+        'seed': args.seed,
+        'results': [],
+    }
+    for size in args.sizes:
+        result = benchmark_size(size, stage_order, args.repeat, args.seed)
+        report['results'].append(result)
+        print_result(result)
+    report['max_rss_bytes'] = max_rss_bytes()
+
+    with open(args.output, 'w') as f:
+        json.dump(report, f, indent=2)
+    print(f"\nResults saved to {args.output}")
+
+    if args.compare:
+        with open(args.compare, 'r') as f:
+            baseline = json.load(f)
+        if compare(report, baseline, args.threshold):
+            sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
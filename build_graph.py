@@ -1,146 +1,370 @@
+import argparse
+import hashlib
 import json
-from collections import defaultdict, deque
-
-# Load course data
-with open('/home/claude/data/courses.json', 'r') as f:
-    data = json.load(f)
-
-courses = data['courses']
-
-# Build graph structure
-nodes = []
-edges = []
-course_map = {}
-
-# Create nodes
-for course in courses:
-    node = {
-        'id': course['code'].replace(' ', ''),  # MATH110, CISC121, etc.
-        'label': f"{course['code']}: {course['name'][:30]}",
-        'fullName': course['name'],
-        'code': course['code'],
-        'subject': course['subject'],
-        'units': course['units'],
-        'level': course['level'],
-        'prerequisites': course['prerequisites']
+
+from closure import ClosureIndex, patch_closure
+from closure import save_index as save_closure
+from course_graph import CourseGraph, node_id
+from graph_formats import read_columns, write_binary, write_columns, write_json_stream, write_ndjson
+from incremental import IncrementalBuild, build_state
+from metrics import Metrics, add_metrics_arguments, instrumented
+from search_index import SearchIndex, patch_search
+from search_index import save_index as save_search
+
+DATA_DIR = '/home/claude/data'
+
+
+def load_courses(path):
+    """Load the course list written by scraper.py"""
+    with open(path, 'r') as f:
+        data = json.load(f)
+    return data['courses']
+
+
+def components_section(graph, components, isolated):
+    ids = graph.ids
+    return {
+        'main': [ids[i] for i in components[0]] if components else [],
+        'isolated': [ids[i] for i in range(len(graph)) if isolated[i]],
+        'all': [[ids[i] for i in comp] for comp in components]
     }
-    nodes.append(node)
-    course_map[course['code']] = node
-
-# Create edges (prerequisite relationships)
-for course in courses:
-    target_id = course['code'].replace(' ', '')
-    
-    for prereq in course['prerequisites']:
-        if prereq in course_map:
-            source_id = prereq.replace(' ', '')
-            edges.append({
-                'source': source_id,
-                'target': target_id,
-                'type': 'prerequisite'
-            })
-
-# Calculate follow-up courses (inverse relationships)
-followups = defaultdict(list)
-for edge in edges:
-    followups[edge['source']].append(edge['target'])
-
-# Add follow-up count to nodes
-for node in nodes:
-    node['followupCount'] = len(followups[node['id']])
-
-# Find connected components using BFS
-def find_components(nodes, edges):
-    """Find connected components in the graph"""
-    # Build adjacency list (undirected)
-    adj = defaultdict(set)
-    for edge in edges:
-        adj[edge['source']].add(edge['target'])
-        adj[edge['target']].add(edge['source'])
-    
-    visited = set()
-    components = []
-    
-    for node in nodes:
-        node_id = node['id']
-        if node_id not in visited:
-            # BFS to find component
-            component = []
-            queue = deque([node_id])
-            visited.add(node_id)
-            
-            while queue:
-                current = queue.popleft()
-                component.append(current)
-                
-                for neighbor in adj[current]:
-                    if neighbor not in visited:
-                        visited.add(neighbor)
-                        queue.append(neighbor)
-            
-            components.append(component)
-    
-    # Sort components by size
-    components.sort(key=len, reverse=True)
-    return components
-
-components = find_components(nodes, edges)
-
-# Categorize nodes
-main_component = components[0] if components else []
-isolated_nodes = [comp[0] for comp in components if len(comp) == 1]
-
-print(f"\nGraph Structure Analysis:")
-print(f"  Total nodes: {len(nodes)}")
-print(f"  Total edges: {len(edges)}")
-print(f"  Number of connected components: {len(components)}")
-print(f"  Largest component size: {len(main_component)} nodes")
-print(f"  Number of isolated nodes: {len(isolated_nodes)}")
-
-print(f"\nComponent sizes:")
-for i, comp in enumerate(components[:10]):  # Show first 10 components
-    print(f"  Component {i+1}: {len(comp)} nodes")
-
-print(f"\nIsolated courses (no prerequisites and no follow-ups):")
-for node_id in isolated_nodes[:10]:  # Show first 10
-    node = next(n for n in nodes if n['id'] == node_id)
-    print(f"  {node['code']}: {node['fullName']}")
-
-# Prepare graph output
-graph_output = {
-    'nodes': nodes,
-    'edges': edges,
-    'components': {
-        'main': main_component,
-        'isolated': isolated_nodes,
-        'all': [[node_id for node_id in comp] for comp in components]
-    },
-    'statistics': {
-        'total_nodes': len(nodes),
-        'total_edges': len(edges),
-        'component_count': len(components),
-        'largest_component_size': len(main_component),
-        'isolated_count': len(isolated_nodes)
+
+
+def statistics_section(node_count, edge_count, components):
+    return {
+        'total_nodes': node_count,
+        'total_edges': edge_count,
+        'component_count': len(components['all']),
+        'largest_component_size': len(components['main']),
+        'isolated_count': len(components['isolated'])
     }
-}
-
-# Save graph data
-with open('/home/claude/data/graph.json', 'w') as f:
-    json.dump(graph_output, f, indent=2)
-
-print(f"\nGraph data saved to graph.json")
-
-# Show some statistics by subject
-print(f"\nCourses by subject:")
-subject_stats = defaultdict(lambda: {'total': 0, 'with_prereqs': 0, 'isolated': 0})
-for node in nodes:
-    subj = node['subject']
-    subject_stats[subj]['total'] += 1
-    if len(node['prerequisites']) > 0:
-        subject_stats[subj]['with_prereqs'] += 1
-    if node['id'] in isolated_nodes:
-        subject_stats[subj]['isolated'] += 1
-
-for subject in sorted(subject_stats.keys()):
-    stats = subject_stats[subject]
-    print(f"  {subject}: {stats['total']} total, {stats['with_prereqs']} with prerequisites, {stats['isolated']} isolated")
+
+
+def write_graph(output_format, nodes, edges, components, statistics, data_dir=DATA_DIR):
+    """Write the graph document in `output_format` to `data_dir`; returns the file name.
+
+    'json' is the indented graph.json, 'stream' the same document encoded one
+    record at a time, and 'ndjson' one JSON record per line in graph.ndjson.
+    """
+    if output_format == 'ndjson':
+        write_ndjson(f'{data_dir}/graph.ndjson', nodes, edges, components, statistics)
+        return 'graph.ndjson'
+    if output_format == 'stream':
+        write_json_stream(f'{data_dir}/graph.json', nodes, edges, components, statistics)
+    else:
+        output = {
+            'nodes': list(nodes),
+            'edges': list(edges),
+            'components': components,
+            'statistics': statistics
+        }
+        save_json(output, f'{data_dir}/graph.json', indent=2)
+    return 'graph.json'
+
+
+def compute_layout(graph, previous_nodes=None):
+    """Rounded (x, y) per node from layout.py, warm-started from `previous_nodes`"""
+    # NumPy is only needed for --layout
+    from layout import WARM_START_ALPHA, layout, seed_positions
+
+    if previous_nodes is None:
+        positions = layout(graph)
+    else:
+        positions = layout(graph, seed_positions(graph, previous_nodes), alpha=WARM_START_ALPHA)
+    print(f"\nLayout computed for {len(graph)} nodes")
+    return [(round(float(x), 1), round(float(y), 1)) for x, y in positions]
+
+
+def placed_positions(graph, previous_nodes):
+    """Rounded (x, y) per node: previous positions kept, new nodes placed among their neighbours"""
+    # Only reached when the previous build has a layout, which already needed NumPy
+    from layout import seed_positions
+
+    return [(round(float(x), 1), round(float(y), 1)) for x, y in seed_positions(graph, previous_nodes)]
+
+
+def with_positions(nodes, positions):
+    for node, (x, y) in zip(nodes, positions):
+        node['x'] = x
+        node['y'] = y
+        yield node
+
+
+def print_summary(graph, components, isolated):
+    main_component = components[0] if components else []
+    isolated_ids = [i for i in range(len(graph)) if isolated[i]]
+
+    print(f"\nGraph Structure Analysis:")
+    print(f"  Total nodes: {len(graph)}")
+    print(f"  Total edges: {graph.edge_count}")
+    print(f"  Number of connected components: {len(components)}")
+    print(f"  Largest component size: {len(main_component)} nodes")
+    print(f"  Number of isolated nodes: {len(isolated_ids)}")
+
+    print(f"\nComponent sizes:")
+    for i, comp in enumerate(components[:10]):  # Show first 10 components
+        print(f"  Component {i+1}: {len(comp)} nodes")
+
+    print(f"\nIsolated courses (no prerequisites and no follow-ups):")
+    for i in isolated_ids[:10]:  # Show first 10
+        course = graph.courses[i]
+        print(f"  {course['code']}: {course['name']}")
+
+
+def print_subject_stats(graph, isolated):
+    print(f"\nCourses by subject:")
+    subject_stats = graph.subject_stats(isolated)
+    for subject in sorted(subject_stats.keys()):
+        stats = subject_stats[subject]
+        print(f"  {subject}: {stats['total']} total, {stats['with_prereqs']} with prerequisites, {stats['isolated']} isolated")
+
+
+def print_closure_summary(closure):
+    print(f"\nPrerequisite closure:")
+    print(f"  Longest prerequisite chain: {max(closure.depth, default=0)} terms")
+    if closure.cycles:
+        print(f"  WARNING: {len(closure.cycles)} prerequisite cycle(s) found:")
+        for cycle in closure.cycles:
+            print(f"    {' <-> '.join(closure.ids[i] for i in cycle)}")
+    else:
+        print(f"  No prerequisite cycles")
+
+
+def save_json(data, path, **kwargs):
+    with open(path, 'w') as f:
+        json.dump(data, f, **kwargs)
+
+
+def build_closure(graph, data_dir=DATA_DIR):
+    # Ancestor/descendant bitsets for "full chain" queries
+    closure = ClosureIndex.build(graph)
+    closure.save(f'{data_dir}/graph_index.json')
+    print_closure_summary(closure)
+    print(f"Closure index saved to graph_index.json")
+
+
+def build_search(nodes, data_dir=DATA_DIR):
+    # Prefix/trigram index behind the search box and server.py /search
+    search = SearchIndex.build(nodes)
+    search.save(f'{data_dir}/search_index.json')
+    print(f"Search index ({len(search.terms)} terms) saved to search_index.json")
+
+
+def count_graph(metrics, graph, components=None):
+    metrics.count('nodes', len(graph))
+    metrics.count('edges', graph.edge_count)
+    # Prerequisites naming a course outside the calendar get no edge
+    metrics.count('dropped_prerequisites', graph.dropped_prerequisites)
+    if components is not None:
+        metrics.count('components', len(components))
+
+
+def full_build(courses, output_format='json', with_layout=False, data_dir=DATA_DIR, metrics=None):
+    metrics = metrics or Metrics('build_graph')
+    with metrics.stage('graph'):
+        graph = CourseGraph(courses)
+    with metrics.stage('components'):
+        components = graph.components()
+        isolated = graph.isolated(components)
+    count_graph(metrics, graph, components)
+
+    with metrics.stage('summary'):
+        print_summary(graph, components, isolated)
+    positions = None
+    if with_layout:
+        with metrics.stage('layout'):
+            positions = compute_layout(graph)
+
+    # Save graph data
+    with metrics.stage('stats'):
+        section = components_section(graph, components, isolated)
+        statistics = statistics_section(len(graph), graph.edge_count, section)
+    nodes = graph.iter_nodes()
+    if positions is not None:
+        nodes = with_positions(nodes, positions)
+    with metrics.stage('write_graph'):
+        name = write_graph(output_format, nodes, graph.iter_edges(), section, statistics, data_dir)
+    with metrics.stage('write_binary'):
+        write_binary(f'{data_dir}/graph.bin', graph, components, positions)
+    with metrics.stage('write_state'):
+        write_state(build_state(courses), data_dir)
+
+    print(f"\nGraph data saved to {name} and graph.bin")
+
+    with metrics.stage('closure'):
+        build_closure(graph, data_dir)
+    with metrics.stage('search'):
+        build_search(graph.nodes(), data_dir)
+
+    with metrics.stage('subject_stats'):
+        print_subject_stats(graph, isolated)
+
+
+def binary_fingerprint(data_dir=DATA_DIR):
+    """Hash of graph.bin, stored in graph_state.json to tie the two together"""
+    with open(f'{data_dir}/graph.bin', 'rb') as f:
+        return hashlib.sha1(f.read()).hexdigest()
+
+
+def write_state(state, data_dir=DATA_DIR):
+    # Written after graph.bin, which --incremental reads as the previous graph
+    state['binary'] = binary_fingerprint(data_dir)
+    with open(f'{data_dir}/graph_state.json', 'w') as f:
+        f.write(json.dumps(state))
+
+
+def update_closure(build, courses, patch, data_dir=DATA_DIR):
+    """Patch graph_index.json for the changed edges, or rebuild it if that is not possible"""
+    ids = [node_id(course['code']) for course in courses]
+    changed = build.added_edges + build.removed_edges
+    data = None
+    try:
+        with open(f'{data_dir}/graph_index.json', 'r') as f:
+            previous = json.load(f)
+    except FileNotFoundError:
+        previous = None
+    if previous is not None:
+        data = patch_closure(previous, ids, lambda i: build.in_edges.get(i, ()),
+                             lambda i: build.out_edges.get(i, ()), changed, patch['nodes']['added'])
+    if data is None:
+        build_closure(CourseGraph(courses), data_dir)
+        return
+    save_closure(data, f'{data_dir}/graph_index.json')
+    print(f"Closure index updated for {len(changed)} changed edges")
+
+
+def update_search(build, courses, patch, data_dir=DATA_DIR):
+    """Patch search_index.json for the added, changed and removed courses"""
+    try:
+        with open(f'{data_dir}/search_index.json', 'r') as f:
+            previous = json.load(f)
+    except FileNotFoundError:
+        build_search([build.node(course) for course in courses], data_dir)
+        return
+    by_id = {node_id(course['code']): course for course in courses}
+
+    def rank_of(i):
+        course = by_id[i]
+        return -len(build.out_edges.get(i, ())), course['level'], course['code']
+
+    data = patch_search(previous, patch['nodes']['updated'], patch['nodes']['removed'], rank_of)
+    save_search(data, f'{data_dir}/search_index.json')
+    print(f"Search index updated for {len(patch['nodes']['updated'])} courses")
+
+
+def incremental_build(courses, write_patch=False, output_format='json', with_layout=False,
+                      data_dir=DATA_DIR, metrics=None, patch_only=False):
+    """Update the previous build in place; returns False if there is none to update.
+
+    The previous graph is read from graph.bin and graph_state.json, so
+    graph.json is only written, never read. With `patch_only` it is not
+    rewritten either: graph_patch.json, graph.bin and the indexes are.
+    """
+    metrics = metrics or Metrics('build_graph')
+    try:
+        with metrics.stage('load_previous'):
+            with open(f'{data_dir}/graph_state.json', 'r') as f:
+                state = json.load(f)
+            previous = read_columns(f'{data_dir}/graph.bin')
+    except (FileNotFoundError, ValueError):
+        return False
+    if state.get('binary') != binary_fingerprint(data_dir):
+        print("graph_state.json does not match graph.bin; running a full build")
+        return False
+
+    with metrics.stage('apply'):
+        build = IncrementalBuild(previous, state)
+        patch = build.apply(courses)
+    nodes, edges = patch['nodes'], patch['edges']
+    for kind in ('added', 'removed', 'updated'):
+        metrics.count(f'nodes_{kind}', len(nodes[kind]))
+    for kind in ('added', 'removed'):
+        metrics.count(f'edges_{kind}', len(edges[kind]))
+
+    print(f"\nIncremental update:")
+    print(f"  Courses added: {len(nodes['added'])}, removed: {len(nodes['removed'])}")
+    print(f"  Nodes updated: {len(nodes['updated'])}")
+    print(f"  Edges added: {len(edges['added'])}, removed: {len(edges['removed'])}")
+
+    with metrics.stage('columns'):
+        columns = build.columns(courses)
+    if with_layout:
+        # Unchanged courses keep their place; new ones settle in around them
+        with metrics.stage('layout'):
+            graph = CourseGraph(courses)
+            columns['positions'] = compute_layout(graph, [build.node(course) for course in courses])
+    elif columns['positions'] is None and build.previous['x'] is not None:
+        # Keep the previous layout: only the nodes without a position are placed
+        with metrics.stage('place_new'):
+            graph = CourseGraph(courses)
+            columns['positions'] = placed_positions(graph, [build.node(course) for course in courses])
+    with metrics.stage('write_binary'):
+        write_columns(f'{data_dir}/graph.bin', courses, **columns)
+    with metrics.stage('write_state'):
+        write_state(build.state(), data_dir)
+    metrics.count('nodes', len(courses))
+    metrics.count('edges', len(columns['sources']))
+    metrics.count('components', columns['component_count'])
+    print(f"  Total nodes: {len(courses)}, edges: {len(columns['sources'])}, "
+          f"components: {columns['component_count']}")
+
+    if not patch_only:
+        with metrics.stage('output'):
+            output = build.output(courses)
+            if columns['positions'] is not None:
+                for node, (x, y) in zip(output['nodes'], columns['positions']):
+                    node['x'] = x
+                    node['y'] = y
+        with metrics.stage('write_graph'):
+            name = write_graph(output_format, output['nodes'], output['edges'], output['components'],
+                               output['statistics'], data_dir)
+        print(f"\nGraph data saved to {name} and graph.bin")
+    else:
+        print(f"\nGraph data saved to graph.bin; graph.json left as it was")
+    if write_patch or patch_only:
+        save_json(patch, f'{data_dir}/graph_patch.json')
+        print(f"Patch saved to graph_patch.json")
+
+    if edges['added'] or edges['removed'] or nodes['added'] or nodes['removed']:
+        with metrics.stage('closure'):
+            update_closure(build, courses, patch, data_dir)
+    if nodes['updated'] or nodes['removed']:
+        with metrics.stage('search'):
+            update_search(build, courses, patch, data_dir)
+    return True
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build graph.json from courses.json')
+    parser.add_argument('--incremental', action='store_true',
+                        help='update the previous build with only the courses that changed')
+    parser.add_argument('--patch', action='store_true',
+                        help='with --incremental, also write the changes to graph_patch.json')
+    parser.add_argument('--patch-only', action='store_true',
+                        help='with --incremental, write graph_patch.json instead of rewriting graph.json '
+                             '(graph.bin and the indexes are still updated)')
+    parser.add_argument('--format', choices=['json', 'stream', 'ndjson'], default='json',
+                        help="graph output: indented graph.json (default), compact graph.json "
+                             "written record by record, or graph.ndjson; graph.bin is always written")
+    parser.add_argument('--layout', action='store_true',
+                        help='precompute node x/y positions (requires NumPy) so the page can skip '
+                             'the force simulation; with --incremental, refines the previous layout')
+    parser.add_argument('--data-dir', default=DATA_DIR,
+                        help=f'directory holding courses.json and the build outputs (default: {DATA_DIR})')
+    parser.add_argument('--courses', help='courses.json to build from (default: <data-dir>/courses.json)')
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrumented('build_graph', args) as metrics:
+        with metrics.stage('load'):
+            courses = load_courses(args.courses or f'{args.data_dir}/courses.json')
+        metrics.count('courses', len(courses))
+
+        if args.incremental and incremental_build(courses, args.patch, args.format, args.layout,
+                                                  args.data_dir, metrics, args.patch_only):
+            return
+        full_build(courses, args.format, args.layout, args.data_dir, metrics)
+
+
+if __name__ == '__main__':
+    main()
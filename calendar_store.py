@@ -0,0 +1,355 @@
+import argparse
+import json
+import os
+import random
+import re
+import sqlite3
+import time
+
+from course_graph import CourseGraph
+from incremental import course_hash
+
+_YEAR = re.compile(r'(\d{4})-\d{4}')
+# Host parameters per IN (...) query, below SQLite's oldest default limit
+_BATCH = 500
+
+_SCHEMA = '''
+CREATE TABLE IF NOT EXISTS years (
+    year INTEGER PRIMARY KEY,
+    subjects TEXT NOT NULL,
+    metadata TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS records (
+    hash TEXT PRIMARY KEY,
+    course TEXT NOT NULL
+) WITHOUT ROWID;
+CREATE TABLE IF NOT EXISTS spans (
+    code TEXT NOT NULL,
+    hash TEXT NOT NULL REFERENCES records (hash),
+    added INTEGER NOT NULL,
+    removed INTEGER
+);
+CREATE INDEX IF NOT EXISTS spans_added ON spans (added);
+CREATE INDEX IF NOT EXISTS spans_removed ON spans (removed);
+CREATE INDEX IF NOT EXISTS spans_code ON spans (code);
+'''
+
+
+def calendar_year(metadata):
+    """First year of the calendar named in courses.json metadata: '... 2025-2026' -> 2025"""
+    match = _YEAR.search(metadata.get('source', ''))
+    return int(match.group(1)) if match else None
+
+
+class CalendarStore:
+    """Course calendars for many academic years in one SQLite file.
+
+    Course records are stored once per distinct content (keyed by the same
+    hash incremental builds use) and referenced by spans: a span says that
+    a course code had a given record from year `added` up to, but not
+    including, year `removed` (NULL while it is still current). A course
+    that does not change costs one span however many years it lasts, and
+    its prerequisite edges are shared with it since they live in the record.
+
+    Years are appended in order, like a log. Adding a year only writes the
+    courses that changed, and the diff between two years reads only the
+    spans that start or end between them, so both run in time proportional
+    to the changes rather than to the calendar size.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.db = sqlite3.connect(path)
+        self.db.executescript(_SCHEMA)
+
+    def close(self):
+        self.db.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def years(self):
+        """Stored years, oldest first"""
+        return [year for (year,) in self.db.execute('SELECT year FROM years ORDER BY year')]
+
+    def metadata(self, year):
+        self._check_year(year)
+        (metadata,) = self.db.execute('SELECT metadata FROM years WHERE year = ?', (year,)).fetchone()
+        return json.loads(metadata)
+
+    def _check_year(self, year):
+        if self.db.execute('SELECT 1 FROM years WHERE year = ?', (year,)).fetchone() is None:
+            raise ValueError(f"No calendar stored for {year}")
+
+    def _previous_year(self, year):
+        row = self.db.execute('SELECT MAX(year) FROM years WHERE year < ?', (year,)).fetchone()
+        return row[0]
+
+    def add(self, year, courses, metadata=None):
+        """Append the calendar for `year`; returns the number of added, changed and removed courses"""
+        latest = self.db.execute('SELECT MAX(year) FROM years').fetchone()[0]
+        if latest is not None and year <= latest:
+            raise ValueError(f"Calendar {year} is not after the latest stored year {latest}")
+
+        current = dict(self.db.execute('SELECT code, hash FROM spans WHERE removed IS NULL'))
+        hashes = {}
+        subjects = []
+        for course in courses:
+            hashes[course['code']] = course_hash(course)
+            if course['subject'] not in subjects:
+                subjects.append(course['subject'])
+
+        ended = [code for code, digest in current.items() if hashes.get(code) != digest]
+        started = [course for course in courses if current.get(course['code']) != hashes[course['code']]]
+        with self.db:
+            self.db.executemany('UPDATE spans SET removed = ? WHERE code = ? AND removed IS NULL',
+                                ((year, code) for code in ended))
+            self.db.executemany('INSERT OR IGNORE INTO records (hash, course) VALUES (?, ?)',
+                                ((hashes[course['code']], json.dumps(course, separators=(',', ':')))
+                                 for course in started))
+            self.db.executemany('INSERT INTO spans (code, hash, added) VALUES (?, ?, ?)',
+                                ((course['code'], hashes[course['code']], year) for course in started))
+            self.db.execute('INSERT INTO years (year, subjects, metadata) VALUES (?, ?, ?)',
+                            (year, json.dumps(subjects), json.dumps(metadata or {})))
+
+        added = sum(1 for course in started if course['code'] not in current)
+        removed = sum(1 for code in ended if code not in hashes)
+        return {'added': added, 'changed': len(started) - added, 'removed': removed}
+
+    def courses(self, year):
+        """Course list of `year`, in the subject and code order of its courses.json"""
+        self._check_year(year)
+        (subjects,) = self.db.execute('SELECT subjects FROM years WHERE year = ?', (year,)).fetchone()
+        order = {subject: k for k, subject in enumerate(json.loads(subjects))}
+        rows = self.db.execute(
+            'SELECT spans.code, records.course FROM spans JOIN records ON records.hash = spans.hash '
+            'WHERE spans.added <= ? AND (spans.removed IS NULL OR spans.removed > ?)', (year, year))
+        courses = [json.loads(course) for code, course in sorted(rows)]
+        courses.sort(key=lambda course: order[course['subject']])
+        return courses
+
+    def graph(self, year):
+        """CourseGraph of the calendar as of `year`"""
+        return CourseGraph(self.courses(year))
+
+    def _records(self, hashes):
+        records = {}
+        hashes = list(hashes)
+        for k in range(0, len(hashes), _BATCH):
+            batch = hashes[k:k + _BATCH]
+            rows = self.db.execute(
+                f"SELECT hash, course FROM records WHERE hash IN ({','.join('?' * len(batch))})", batch)
+            records.update((digest, json.loads(course)) for digest, course in rows)
+        return records
+
+    def diff(self, year, since=None):
+        """Courses added, removed and changed between `since` (default: the previous stored year) and `year`.
+
+        Changed courses list their added and removed prerequisites and the
+        names of any other fields that differ. A course that changed and
+        changed back in between is not reported.
+        """
+        self._check_year(year)
+        if since is None:
+            since = self._previous_year(year)
+        if since is not None:
+            self._check_year(since)
+            if since >= year:
+                raise ValueError(f"{since} is not before {year}")
+        start = since if since is not None else self.years()[0] - 1
+
+        old = {}
+        new = {}
+        rows = self.db.execute(
+            'SELECT code, hash, added, removed FROM spans '
+            'WHERE (added > ? AND added <= ?) OR (removed > ? AND removed <= ?)',
+            (start, year, start, year))
+        for code, digest, added, removed in rows:
+            if added <= start:
+                old[code] = digest
+            elif removed is None or removed > year:
+                new[code] = digest
+
+        changed_codes = sorted(code for code in new.keys() & old.keys() if new[code] != old[code])
+        records = self._records({old[code] for code in changed_codes} | {new[code] for code in changed_codes})
+        changed = []
+        for code in changed_codes:
+            before, after = records[old[code]], records[new[code]]
+            prereqs_before, prereqs_after = set(before['prerequisites']), set(after['prerequisites'])
+            changed.append({
+                'code': code,
+                'prerequisites': {
+                    'added': sorted(prereqs_after - prereqs_before),
+                    'removed': sorted(prereqs_before - prereqs_after),
+                },
+                'fields': sorted(name for name in before.keys() | after.keys()
+                                 if name != 'prerequisites' and before.get(name) != after.get(name)),
+            })
+        return {
+            'from': since,
+            'to': year,
+            'added': sorted(new.keys() - old.keys()),
+            'removed': sorted(old.keys() - new.keys()),
+            'changed': changed,
+        }
+
+    def history(self, code):
+        """(first year, year removed or None, course) for every version of one course"""
+        rows = self.db.execute(
+            'SELECT spans.added, spans.removed, records.course FROM spans '
+            'JOIN records ON records.hash = spans.hash WHERE spans.code = ? ORDER BY spans.added', (code,))
+        return [(added, removed, json.loads(course)) for added, removed, course in rows]
+
+
+def synthetic_history(course_count, years, seed=0, churn=0.05):
+    """Yearly course lists: a synthetic calendar where each year edits, drops and adds a few courses"""
+    from benchmark import synthetic_calendar
+    from scraper import extract_courses_from_text
+
+    rng = random.Random(seed)
+    courses = []
+    for subject, text in synthetic_calendar(course_count, seed).items():
+        courses.extend(extract_courses_from_text(text, subject))
+    history = [courses]
+    for _ in range(years - 1):
+        courses = [dict(course) for course in courses]
+        codes = [course['code'] for course in courses]
+        for course in rng.sample(courses, int(len(courses) * churn)):
+            if course['level'] > 100 and rng.random() < 0.7:
+                lower = [code for code in codes
+                         if code[:4] == course['subject'] and int(code[5:]) < int(course['code'][5:])]
+                prereqs = set(rng.sample(lower, min(len(lower), rng.randint(0, 3))))
+                course['prerequisites'] = sorted(prereqs)
+            else:
+                course['name'] += ' I'
+        dropped = set(rng.sample(codes, int(len(codes) * churn / 5)))
+        courses = [course for course in courses if course['code'] not in dropped]
+        taken = {course['code'] for course in courses} | dropped
+        for _ in range(len(dropped)):
+            subject = rng.choice(courses)['subject']
+            number = rng.randrange(100, 1000)
+            code = f'{subject} {number}'
+            if code not in taken:
+                taken.add(code)
+                courses.append({'code': code, 'name': 'New Course', 'units': 3.0, 'prerequisites': [],
+                                'subject': subject, 'level': number // 100 * 100})
+        history.append(courses)
+    return history
+
+
+def benchmark(path, course_count, years=10):
+    """Store a synthetic decade of calendars and time appends, materialisation and diffs"""
+    history = synthetic_history(course_count, years)
+    first = 2025 - years + 1
+    with CalendarStore(path) as store:
+        start = time.perf_counter()
+        for year, courses in enumerate(history, first):
+            store.add(year, courses)
+        print(f"Stored {years} calendars of ~{course_count} courses in {time.perf_counter() - start:.2f} s")
+        full_copies = sum(len(json.dumps({'courses': courses}, indent=2)) for courses in history)
+        print(f"  store {os.path.getsize(path) / 2**20:.1f} MiB, "
+              f"{years} courses.json copies {full_copies / 2**20:.1f} MiB")
+
+        start = time.perf_counter()
+        graph = store.graph(first + years // 2)
+        print(f"  graph as of {first + years // 2}: {len(graph)} courses, {graph.edge_count} edges "
+              f"in {(time.perf_counter() - start) * 1000:.1f} ms")
+
+        timings = []
+        for year in range(first + 1, first + years):
+            start = time.perf_counter()
+            diff = store.diff(year)
+            timings.append(time.perf_counter() - start)
+        print(f"  yearly diff ({len(diff['added'])} added, {len(diff['removed'])} removed, "
+              f"{len(diff['changed'])} changed): mean {sum(timings) / len(timings) * 1000:.1f} ms")
+
+
+def print_diff(diff):
+    print(f"{diff['from']} -> {diff['to']}: {len(diff['added'])} added, "
+          f"{len(diff['removed'])} removed, {len(diff['changed'])} changed")
+    for code in diff['added']:
+        print(f"  + {code}")
+    for code in diff['removed']:
+        print(f"  - {code}")
+    for change in diff['changed']:
+        parts = [f"+{p}" for p in change['prerequisites']['added']]
+        parts += [f"-{p}" for p in change['prerequisites']['removed']]
+        if change['fields']:
+            parts.append(f"({', '.join(change['fields'])})")
+        print(f"  ~ {change['code']}: {' '.join(parts)}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Keep course calendars for many academic years and compare them')
+    parser.add_argument('--store', default='calendars.db', help='calendar store file (default: calendars.db)')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    add = commands.add_parser('add', help='append a courses.json written by scraper.py')
+    add.add_argument('courses', help='courses.json to store')
+    add.add_argument('--year', type=int, help="calendar year (default: from the file's source, e.g. 2025-2026)")
+
+    commands.add_parser('years', help='list stored years')
+
+    export = commands.add_parser('export', help='write the courses.json of one year')
+    export.add_argument('year', type=int)
+    export.add_argument('--output', default='courses.json', help='file to write (default: courses.json)')
+
+    diff = commands.add_parser('diff', help='courses added, removed and changed in a year')
+    diff.add_argument('year', type=int)
+    diff.add_argument('--since', type=int, help='year to compare against (default: the previous stored year)')
+    diff.add_argument('--json', action='store_true', help='print the diff as JSON')
+
+    history = commands.add_parser('history', help='every stored version of one course')
+    history.add_argument('code', help="course code, e.g. 'MATH 110'")
+
+    bench = commands.add_parser('benchmark', help='time a synthetic decade of calendars')
+    bench.add_argument('courses', type=int, help='courses per calendar')
+    bench.add_argument('--years', type=int, default=10, help='calendars to store (default: 10)')
+    args = parser.parse_args(argv)
+
+    if args.command == 'benchmark':
+        if os.path.exists(args.store):
+            parser.error(f"{args.store} already exists; benchmark into a new --store file")
+        benchmark(args.store, args.courses, args.years)
+        return
+
+    with CalendarStore(args.store) as store:
+        try:
+            if args.command == 'add':
+                with open(args.courses, 'r') as f:
+                    data = json.load(f)
+                metadata = data.get('metadata', {})
+                year = args.year or calendar_year(metadata)
+                if year is None:
+                    parser.error('no calendar year in the file metadata; pass --year')
+                counts = store.add(year, data['courses'], metadata)
+                print(f"Stored {year}: {counts['added']} added, {counts['changed']} changed, "
+                      f"{counts['removed']} removed")
+            elif args.command == 'years':
+                for year in store.years():
+                    print(f"{year}: {store.metadata(year).get('total_courses', '?')} courses")
+            elif args.command == 'export':
+                output = {'courses': store.courses(args.year), 'metadata': store.metadata(args.year)}
+                with open(args.output, 'w') as f:
+                    json.dump(output, f, indent=2)
+                print(f"Wrote {len(output['courses'])} courses to {args.output}")
+            elif args.command == 'diff':
+                result = store.diff(args.year, args.since)
+                if args.json:
+                    print(json.dumps(result, indent=2))
+                else:
+                    print_diff(result)
+            elif args.command == 'history':
+                for added, removed, course in store.history(args.code):
+                    until = f"until {removed}" if removed is not None else 'onward'
+                    prereqs = ', '.join(course['prerequisites']) or 'None'
+                    print(f"  {added} {until}: {course['name']} ({course['units']} units) - Prerequisites: {prereqs}")
+        except ValueError as e:
+            parser.error(str(e))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,337 @@
+import json
+from array import array
+from bisect import bisect_left
+from collections import deque
+from itertools import accumulate
+
+
+def encode_bits(bits):
+    """Sorted indexes for graph_index.json: the gaps between them, or a hex bitset if that is shorter.
+
+    A bitset is as wide as its highest index, so even a course with two
+    prerequisites would need as many bits as the position of its furthest
+    one; most sets are sparse and much shorter as gap lists.
+    """
+    width = bits[-1] + 1 if bits else 0
+    if 16 * len(bits) >= width:
+        raw = bytearray((width + 7) // 8)
+        for j in bits:
+            raw[j >> 3] |= 1 << (j & 7)
+        return format(int.from_bytes(raw, 'little'), 'x')
+    return [j - p for p, j in zip([0] + list(bits), bits)]
+
+
+def decode_bits(data):
+    """Sorted index array (array('i')) of a set stored by encode_bits"""
+    if isinstance(data, str):
+        mask = int(data, 16)
+        raw = mask.to_bytes((mask.bit_length() + 7) // 8, 'little')
+        return array('i', (8 * k + b for k, byte in enumerate(raw) if byte for b in range(8) if byte >> b & 1))
+    return array('i', accumulate(data))
+
+
+def strongly_connected_components(graph):
+    """Tarjan's algorithm over the follow-up edges of a CourseGraph.
+
+    Components are returned in topological order: every prerequisite's
+    component comes before the components of the courses it unlocks.
+    """
+    n = len(graph)
+    offsets, targets = graph.out_offsets, graph.out_targets
+    index = [-1] * n
+    low = [0] * n
+    on_stack = bytearray(n)
+    stack = []
+    components = []
+    counter = 0
+
+    for root in range(n):
+        if index[root] != -1:
+            continue
+        # Explicit DFS stack of (node, next edge position) to avoid recursion
+        work = [(root, offsets[root])]
+        index[root] = low[root] = counter
+        counter += 1
+        stack.append(root)
+        on_stack[root] = 1
+
+        while work:
+            v, k = work[-1]
+            if k < offsets[v + 1]:
+                work[-1] = (v, k + 1)
+                w = targets[k]
+                if index[w] == -1:
+                    index[w] = low[w] = counter
+                    counter += 1
+                    stack.append(w)
+                    on_stack[w] = 1
+                    work.append((w, offsets[w]))
+                elif on_stack[w] and index[w] < low[v]:
+                    low[v] = index[w]
+                continue
+
+            work.pop()
+            if work:
+                parent = work[-1][0]
+                if low[v] < low[parent]:
+                    low[parent] = low[v]
+            if low[v] == index[v]:
+                component = []
+                while True:
+                    w = stack.pop()
+                    on_stack[w] = 0
+                    component.append(w)
+                    if w == v:
+                        break
+                components.append(component)
+
+    components.reverse()
+    return components
+
+
+class ClosureIndex:
+    """Transitive prerequisite closure of a course graph.
+
+    `ancestors[i]` and `descendants[i]` are sorted index arrays
+    (array('i')) of the courses that are, respectively, direct or indirect
+    prerequisites of course i, and the courses that course i eventually
+    unlocks; members of one strongly connected component share an array.
+    Memory follows the size of the closure, not the number of courses.
+    `depth[i]` is the length of the longest prerequisite chain ending at
+    course i, counting the course itself, i.e. the minimum number of terms
+    needed to reach it. Courses on a prerequisite cycle are reported in
+    `cycles`.
+    """
+
+    def __init__(self, ids, order, ancestors, descendants, depth, cycles):
+        self.ids = ids
+        self.index = {node_id: i for i, node_id in enumerate(ids)}
+        self.order = order
+        self.ancestors = ancestors
+        self.descendants = descendants
+        self.depth = depth
+        self.cycles = cycles
+
+    @classmethod
+    def build(cls, graph):
+        n = len(graph)
+        components = strongly_connected_components(graph)
+        component_of = [0] * n
+        for c, component in enumerate(components):
+            for i in component:
+                component_of[i] = c
+
+        empty = array('i')
+        ancestors = [empty] * n
+        depth = [0] * n
+        cycles = []
+        on_cycle = bytearray(len(components))
+        for c, component in enumerate(components):
+            members = set()
+            longest = 0
+            cyclic = False
+            for i in component:
+                for p in graph.prerequisites(i):
+                    if component_of[p] == c:
+                        cyclic = True
+                        continue
+                    members.update(ancestors[p])
+                    members.add(p)
+                    if depth[p] > longest:
+                        longest = depth[p]
+            if cyclic:
+                # Every member of a cycle (or self-loop) requires every member
+                cycles.append(sorted(component))
+                on_cycle[c] = 1
+                members.update(component)
+            bits = array('i', sorted(members)) if members else empty
+            for i in component:
+                ancestors[i] = bits
+                depth[i] = longest + 1
+
+        descendants = [empty] * n
+        for c in range(len(components) - 1, -1, -1):
+            component = components[c]
+            members = set()
+            for i in component:
+                for f in graph.followups(i):
+                    if component_of[f] != c:
+                        members.update(descendants[f])
+                        members.add(f)
+            if on_cycle[c]:
+                members.update(component)
+            bits = array('i', sorted(members)) if members else empty
+            for i in component:
+                descendants[i] = bits
+
+        # Shallower courses first, so the order does not depend on how the
+        # components were found and patch_closure can reproduce it exactly
+        order = sorted(range(n), key=depth.__getitem__)
+        return cls(list(graph.ids), order, ancestors, descendants, depth, cycles)
+
+    def ancestor_ids(self, i):
+        """Ids of every course needed before course `i`"""
+        return [self.ids[j] for j in self.ancestors[i]]
+
+    def descendant_ids(self, i):
+        """Ids of every course that course `i` eventually unlocks"""
+        return [self.ids[j] for j in self.descendants[i]]
+
+    def requires(self, i, j):
+        """True if course `j` is a direct or indirect prerequisite of course `i`"""
+        bits = self.ancestors[i]
+        k = bisect_left(bits, j)
+        return k < len(bits) and bits[k] == j
+
+    def to_dict(self):
+        ids = self.ids
+        return {
+            'ids': ids,
+            'order': [ids[i] for i in self.order],
+            'depth': self.depth,
+            'ancestors': [encode_bits(bits) for bits in self.ancestors],
+            'descendants': [encode_bits(bits) for bits in self.descendants],
+            'cycles': [[ids[i] for i in cycle] for cycle in self.cycles],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        ids = data['ids']
+        index = {node_id: i for i, node_id in enumerate(ids)}
+        return cls(
+            ids,
+            [index[node_id] for node_id in data['order']],
+            [decode_bits(bits) for bits in data['ancestors']],
+            [decode_bits(bits) for bits in data['descendants']],
+            data['depth'],
+            [[index[node_id] for node_id in cycle] for cycle in data['cycles']],
+        )
+
+    def save(self, path):
+        save_index(self.to_dict(), path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+def save_index(data, path):
+    # One dumps call runs entirely in the C encoder; json.dump streams
+    # through the pure-Python one
+    with open(path, 'w') as f:
+        f.write(json.dumps(data))
+
+
+def _topological(members, before, after):
+    """`members` ordered so each comes after its `before` neighbours inside `members`, or None on a cycle"""
+    waiting = dict.fromkeys(members, 0)
+    for i in members:
+        for j in before(i):
+            if j in waiting:
+                waiting[i] += 1
+    ready = deque(i for i, count in waiting.items() if count == 0)
+    order = []
+    while ready:
+        i = ready.popleft()
+        order.append(i)
+        for j in after(i):
+            if j in waiting:
+                waiting[j] -= 1
+                if waiting[j] == 0:
+                    ready.append(j)
+    return order if len(order) == len(members) else None
+
+
+def _reachable(starts, neighbours):
+    seen = dict.fromkeys(starts)
+    stack = list(seen)
+    while stack:
+        for j in neighbours(stack.pop()):
+            if j not in seen:
+                seen[j] = None
+                stack.append(j)
+    return list(seen)
+
+
+def patch_closure(data, ids, prerequisites, followups, changed_edges, added):
+    """Update a graph_index.json document (ClosureIndex.to_dict) after an incremental build.
+
+    `ids` are the new node ids in order, `prerequisites` and `followups` map
+    a node id to its direct neighbours in the new graph, `changed_edges`
+    are the (source, target) id pairs added or removed and `added` the new
+    node ids. Ancestor sets and depths are recomputed only for the targets
+    and everything below them, descendant sets only for the sources and
+    everything above them; all other sets are kept, renumbered if earlier
+    courses were added or removed, and the topological order is re-sorted
+    by depth as in ClosureIndex.build. Returns None when a prerequisite
+    cycle is involved, which needs a full ClosureIndex.build.
+    """
+    if data['cycles']:
+        return None
+    index = {node_id: k for k, node_id in enumerate(ids)}
+    old_ids = data['ids']
+    old_index = {node_id: k for k, node_id in enumerate(old_ids)}
+    # Bit positions below the first moved course are unchanged
+    same = next((k for k, (a, b) in enumerate(zip(ids, old_ids)) if a != b), min(len(ids), len(old_ids)))
+    renumber = [index.get(node_id) for node_id in old_ids[same:]]
+
+    def renumbered(stored):
+        return [j if j < same else renumber[j - same] for j in decode_bits(stored)]
+
+    def carry(stored):
+        # The highest index is the sum of the gaps, so most sets are kept without decoding
+        last = int(stored, 16).bit_length() - 1 if isinstance(stored, str) else sum(stored) if stored else -1
+        if last < same:
+            return stored
+        return encode_bits(sorted(renumbered(stored)))
+
+    def old_bits(kind, node_id):
+        return renumbered(data[kind][old_index[node_id]])
+
+    targets = [t for s, t in changed_edges if t in index] + list(added)
+    sources = [s for s, t in changed_edges if s in index] + list(added)
+    below = _topological(_reachable(targets, followups), prerequisites, followups)
+    above = _topological(_reachable(sources, prerequisites), followups, prerequisites)
+    if below is None or above is None:
+        return None
+
+    ancestors = {}
+    depth = {}
+    for i in below:
+        members = set()
+        longest = 0
+        for p in prerequisites(i):
+            members.update(ancestors[p] if p in ancestors else old_bits('ancestors', p))
+            members.add(index[p])
+            longest = max(longest, depth[p] if p in depth else data['depth'][old_index[p]])
+        ancestors[i] = members
+        depth[i] = longest + 1
+    descendants = {}
+    for i in above:
+        members = set()
+        for f in followups(i):
+            members.update(descendants[f] if f in descendants else old_bits('descendants', f))
+            members.add(index[f])
+        descendants[i] = members
+
+    result = {'ids': ids, 'order': None}
+    if ids == old_ids:
+        # Nothing was added or removed: copy the stored columns and overwrite what changed
+        result['depth'] = list(data['depth'])
+        result['ancestors'] = list(data['ancestors'])
+        result['descendants'] = list(data['descendants'])
+    else:
+        result['depth'] = [data['depth'][old_index[i]] if i in old_index else 0 for i in ids]
+        # Recomputed sets may still name removed courses, so they are not carried
+        result['ancestors'] = [[] if i in ancestors else carry(data['ancestors'][old_index[i]]) for i in ids]
+        result['descendants'] = [[] if i in descendants else carry(data['descendants'][old_index[i]])
+                                 for i in ids]
+    for i, members in ancestors.items():
+        result['ancestors'][index[i]] = encode_bits(sorted(members))
+        result['depth'][index[i]] = depth[i]
+    for i, members in descendants.items():
+        result['descendants'][index[i]] = encode_bits(sorted(members))
+    result['order'] = [ids[k] for k in sorted(range(len(ids)), key=result['depth'].__getitem__)]
+    result['cycles'] = []
+    return result
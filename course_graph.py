@@ -0,0 +1,184 @@
+from array import array
+from collections import defaultdict
+
+from prerequisites import AND, restrict
+
+
+def node_id(code):
+    """Turn a course code like 'MATH 110' into a graph id like 'MATH110'"""
+    return code.replace(' ', '')
+
+
+def course_node(course, followup_count):
+    """Node dict for a course in the graph.json format; `requirements` only when it has a tree"""
+    node = {
+        'id': node_id(course['code']),
+        'label': f"{course['code']}: {course['name'][:30]}",
+        'fullName': course['name'],
+        'code': course['code'],
+        'subject': course['subject'],
+        'units': course['units'],
+        'level': course['level'],
+        'prerequisites': course['prerequisites'],
+    }
+    if course.get('requirements') is not None:
+        node['requirements'] = course['requirements']
+    node['followupCount'] = followup_count
+    return node
+
+
+def _csr(n, keys, values):
+    """Build CSR offset/target arrays grouping `values` by `keys`"""
+    offsets = array('i', bytes(4 * (n + 1)))
+    for k in keys:
+        offsets[k + 1] += 1
+    for i in range(n):
+        offsets[i + 1] += offsets[i]
+
+    targets = array('i', bytes(4 * len(values)))
+    cursor = array('i', offsets[:n])
+    for k, v in zip(keys, values):
+        targets[cursor[k]] = v
+        cursor[k] += 1
+    return offsets, targets
+
+
+class CourseGraph:
+    """Prerequisite graph with interned course ids and CSR adjacency.
+
+    Course codes are interned to integer ids in input order. Edges point from
+    prerequisite to dependent course and are stored twice: `out_offsets` /
+    `out_targets` for follow-ups and `in_offsets` / `in_targets` for
+    prerequisites. Prerequisites that are not themselves courses are dropped.
+    """
+
+    def __init__(self, courses):
+        self.courses = courses
+        self.codes = [course['code'] for course in courses]
+        self.ids = [node_id(code) for code in self.codes]
+        self.index = {code: i for i, code in enumerate(self.codes)}
+
+        n = len(self.codes)
+        self.edge_sources = array('i')
+        self.edge_targets = array('i')
+        self.dropped_prerequisites = 0
+        for target, course in enumerate(courses):
+            for prereq in course['prerequisites']:
+                source = self.index.get(prereq)
+                if source is None:
+                    self.dropped_prerequisites += 1
+                    continue
+                self.edge_sources.append(source)
+                self.edge_targets.append(target)
+
+        self.out_offsets, self.out_targets = _csr(n, self.edge_sources, self.edge_targets)
+        self.in_offsets, self.in_targets = _csr(n, self.edge_targets, self.edge_sources)
+
+    def __len__(self):
+        return len(self.codes)
+
+    @property
+    def edge_count(self):
+        return len(self.edge_sources)
+
+    def followups(self, i):
+        """Ids of the courses that list course `i` as a prerequisite"""
+        return self.out_targets[self.out_offsets[i]:self.out_offsets[i + 1]]
+
+    def prerequisites(self, i):
+        """Ids of the (known) prerequisites of course `i`"""
+        return self.in_targets[self.in_offsets[i]:self.in_offsets[i + 1]]
+
+    def requirements(self, i):
+        """AND/OR tree of course codes needed before course `i`, or None.
+
+        Courses without a parsed tree require all their prerequisites. As
+        with the edges, codes that are not courses in the graph do not hold
+        a course back: they count as met.
+        """
+        course = self.courses[i]
+        tree = course.get('requirements')
+        if tree is None and course['prerequisites']:
+            tree = {AND: course['prerequisites']}
+        code = self.codes[i]
+        return restrict(tree, lambda prereq: prereq != code and prereq in self.index)
+
+    def followup_count(self, i):
+        return self.out_offsets[i + 1] - self.out_offsets[i]
+
+    def prerequisite_count(self, i):
+        return self.in_offsets[i + 1] - self.in_offsets[i]
+
+    def components(self):
+        """Weakly connected components as lists of ids in node order, largest first"""
+        n = len(self.codes)
+        visited = bytearray(n)
+        components = []
+
+        for start in range(n):
+            if visited[start]:
+                continue
+            # Iterative BFS over both edge directions; the component list
+            # doubles as the queue
+            visited[start] = 1
+            component = [start]
+            head = 0
+            while head < len(component):
+                current = component[head]
+                head += 1
+                for offsets, targets in ((self.out_offsets, self.out_targets),
+                                         (self.in_offsets, self.in_targets)):
+                    for k in range(offsets[current], offsets[current + 1]):
+                        neighbor = targets[k]
+                        if not visited[neighbor]:
+                            visited[neighbor] = 1
+                            component.append(neighbor)
+            component.sort()
+            components.append(component)
+
+        # Stable sort: equal-sized components stay in order of their first course
+        components.sort(key=len, reverse=True)
+        return components
+
+    def isolated(self, components=None):
+        """Flags marking courses with no prerequisite or follow-up edges"""
+        if components is None:
+            components = self.components()
+        flags = bytearray(len(self.codes))
+        for component in components:
+            if len(component) == 1:
+                flags[component[0]] = 1
+        return flags
+
+    def subject_stats(self, isolated=None):
+        """Per-subject totals, courses with prerequisites and isolated courses"""
+        if isolated is None:
+            isolated = self.isolated()
+        stats = defaultdict(lambda: {'total': 0, 'with_prereqs': 0, 'isolated': 0})
+        for i, course in enumerate(self.courses):
+            subj = stats[course['subject']]
+            subj['total'] += 1
+            if len(course['prerequisites']) > 0:
+                subj['with_prereqs'] += 1
+            if isolated[i]:
+                subj['isolated'] += 1
+        return stats
+
+    def node(self, i):
+        """Node dict for course `i` in the graph.json format"""
+        return course_node(self.courses[i], self.followup_count(i))
+
+    def iter_nodes(self):
+        for i in range(len(self.codes)):
+            yield self.node(i)
+
+    def iter_edges(self):
+        ids = self.ids
+        for s, t in zip(self.edge_sources, self.edge_targets):
+            yield {'source': ids[s], 'target': ids[t], 'type': 'prerequisite'}
+
+    def nodes(self):
+        return list(self.iter_nodes())
+
+    def edges(self):
+        return list(self.iter_edges())
@@ -0,0 +1,226 @@
+import argparse
+import json
+import random
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import numpy as np
+
+from course_graph import CourseGraph
+from prerequisites import AND, OR, satisfied
+
+
+class EligibilityIndex:
+    """Batched "which courses can this student take next" queries.
+
+    Courses follow the order of the `nodes` list in graph.json. A student is
+    eligible for a course they have not completed once its AND/OR
+    requirement tree is met. Completions are stored course-major as student
+    bitsets (row c, bit s: student s completed course c). Every and/or group
+    of every tree becomes one more row, the AND or OR of its operands' rows,
+    so a whole cohort is evaluated with a handful of vectorised row gathers
+    per level of nesting.
+    """
+
+    # Student bytes (8 students each) per thread-pool task with workers > 1
+    CHUNK_BYTES = 1024
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.codes = graph.codes
+        self.lookup = dict(graph.index)
+        self.lookup.update((node_id, i) for i, node_id in enumerate(graph.ids))
+
+        # Group rows are numbered after the course rows and bucketed by
+        # nesting depth, so every operand is ready before a group reads it
+        n = len(graph)
+        groups = defaultdict(list)
+        self.group_count = 0
+
+        def compile_tree(tree):
+            """(row, depth) of a requirement (sub)tree"""
+            if isinstance(tree, str):
+                return graph.index[tree], 0
+            op = AND if AND in tree else OR
+            operands = [compile_tree(child) for child in tree[op]]
+            depth = 1 + max(d for _, d in operands)
+            row = n + self.group_count
+            self.group_count += 1
+            groups[depth, op].append((row, [r for r, _ in operands]))
+            return row, depth
+
+        courses = []
+        roots = []
+        for i in range(n):
+            tree = graph.requirements(i)
+            if tree is not None:
+                courses.append(i)
+                roots.append(compile_tree(tree)[0])
+        self.roots = np.array(courses, dtype=np.intp), np.array(roots, dtype=np.intp)
+
+        # Step k of a group level copies (k = 0) or combines every group's
+        # k-th operand, as (op, group rows, operand rows)
+        self.steps = []
+        for depth, op in sorted(groups):
+            rows = np.array([row for row, _ in groups[depth, op]], dtype=np.intp)
+            operands = [operands for _, operands in groups[depth, op]]
+            arity = np.array([len(o) for o in operands])
+            for k in range(int(arity.max())):
+                keep = np.flatnonzero(arity > k)
+                self.steps.append((op if k else None, rows[keep],
+                                   np.array([operands[g][k] for g in keep], dtype=np.intp)))
+
+    @classmethod
+    def load(cls, path):
+        """Index over a graph.json written by build_graph.py"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(CourseGraph(data['nodes']))
+
+    def completion_bits(self, transcripts):
+        """(courses x student bytes) bitsets; unknown course codes are ignored.
+
+        Bits use np.packbits order: student s is bit 7 - s % 8 of byte s // 8.
+        """
+        lookup = self.lookup
+        rows = []
+        students = []
+        for s, transcript in enumerate(transcripts):
+            for code in transcript:
+                i = lookup.get(code)
+                if i is not None:
+                    rows.append(i)
+                    students.append(s)
+
+        bits = np.zeros((len(self.codes), (len(transcripts) + 7) // 8), dtype=np.uint8)
+        rows = np.array(rows, dtype=np.intp)
+        students = np.array(students, dtype=np.intp)
+        masks = (0x80 >> (students & 7)).astype(np.uint8)
+        np.bitwise_or.at(bits, (rows, students >> 3), masks)
+        return bits
+
+    def _eligible_chunk(self, bits):
+        rows = np.empty((len(bits) + self.group_count, bits.shape[1]), dtype=np.uint8)
+        rows[:len(bits)] = bits
+        for op, groups, operands in self.steps:
+            if op is None:
+                rows[groups] = rows[operands]
+            elif op == AND:
+                rows[groups] &= rows[operands]
+            else:
+                rows[groups] |= rows[operands]
+        met = np.full_like(bits, 0xFF)
+        courses, roots = self.roots
+        met[courses] = rows[roots]
+        return met & ~bits
+
+    def eligible_bits(self, bits, workers=1):
+        """Eligibility bitsets, same layout as `completion_bits`.
+
+        The whole cohort is one pass on the calling thread. With `workers`
+        above 1 it is split into student chunks on a thread pool of that
+        size (NumPy releases the GIL inside the gathers); measure before
+        turning this on, since the pool only pays off on several idle cores.
+        """
+        width = bits.shape[1]
+        if workers <= 1 or width <= self.CHUNK_BYTES:
+            return self._eligible_chunk(bits)
+        chunks = [bits[:, k:k + self.CHUNK_BYTES] for k in range(0, width, self.CHUNK_BYTES)]
+        with ThreadPoolExecutor(max_workers=workers) as pool:
+            return np.concatenate(list(pool.map(self._eligible_chunk, chunks)), axis=1)
+
+    def eligible(self, completed, workers=1):
+        """Boolean (students x courses) eligibility for a boolean completion matrix"""
+        students = completed.shape[0]
+        bits = np.packbits(completed.T, axis=1)
+        eligible = np.unpackbits(self.eligible_bits(bits, workers), axis=1, count=students)
+        return eligible.T.view(bool)
+
+    def eligible_codes(self, transcripts, workers=1):
+        """Eligible course codes for each transcript (a list of course codes)"""
+        bits = self.eligible_bits(self.completion_bits(transcripts), workers)
+        eligible = np.unpackbits(bits, axis=1, count=len(transcripts))
+        students, courses = np.nonzero(eligible.T)
+        bounds = np.searchsorted(students, np.arange(len(transcripts) + 1))
+        codes = self.codes
+        return [
+            [codes[i] for i in courses[bounds[s]:bounds[s + 1]]]
+            for s in range(len(transcripts))
+        ]
+
+
+def naive_eligible_codes(graph, transcripts):
+    """Per-student reference loop, used to check and benchmark the batched path"""
+    trees = [graph.requirements(i) for i in range(len(graph))]
+    results = []
+    for transcript in transcripts:
+        completed = set(transcript)
+        results.append([
+            graph.codes[i] for i in range(len(graph))
+            if graph.codes[i] not in completed and satisfied(trees[i], completed)
+        ])
+    return results
+
+
+def random_transcripts(graph, students, seed=0):
+    """Synthetic transcripts of up to 30 courses, each taken after its prerequisites"""
+    rng = random.Random(seed)
+    transcripts = []
+    for _ in range(students):
+        taken = set()
+        for _ in range(rng.randint(0, 30)):
+            available = [i for i in rng.sample(range(len(graph)), min(len(graph), 20))
+                         if i not in taken and all(p in taken for p in graph.prerequisites(i))]
+            if available:
+                taken.add(available[0])
+        transcripts.append([graph.codes[i] for i in taken])
+    return transcripts
+
+
+def benchmark(index, students, workers=1):
+    transcripts = random_transcripts(index.graph, students)
+
+    start = time.perf_counter()
+    index.eligible_bits(index.completion_bits(transcripts), workers)
+    batched = time.perf_counter() - start
+
+    start = time.perf_counter()
+    expected = naive_eligible_codes(index.graph, transcripts)
+    naive = time.perf_counter() - start
+
+    assert index.eligible_codes(transcripts, workers) == expected
+    codes = index.codes
+
+    print(f"{students} students x {len(codes)} courses:")
+    print(f"  batched: {batched * 1000:.1f} ms")
+    print(f"  naive:   {naive * 1000:.1f} ms ({naive / batched:.1f}x slower)")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='List the courses each student can take next')
+    parser.add_argument('transcripts', nargs='?',
+                        help='JSON file mapping student ids to lists of completed course codes')
+    parser.add_argument('--graph', default='graph.json', help='graph.json written by build_graph.py')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='worker threads for large cohorts (default: 1, no thread pool)')
+    parser.add_argument('--benchmark', type=int, metavar='STUDENTS',
+                        help='compare against the per-student loop on synthetic transcripts')
+    args = parser.parse_args(argv)
+
+    index = EligibilityIndex.load(args.graph)
+    if args.benchmark:
+        benchmark(index, args.benchmark, args.workers)
+        return
+    if not args.transcripts:
+        parser.error('a transcripts file or --benchmark is required')
+
+    with open(args.transcripts, 'r') as f:
+        transcripts = json.load(f)
+    students = list(transcripts)
+    eligible = index.eligible_codes([transcripts[s] for s in students], args.workers)
+    print(json.dumps(dict(zip(students, eligible)), indent=2))
+
+
+if __name__ == '__main__':
+    main()
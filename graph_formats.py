@@ -0,0 +1,236 @@
+import json
+import struct
+import sys
+from array import array
+
+from course_graph import course_node, node_id
+
+# Compact separators; the streaming writers never build the whole document
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+BINARY_MAGIC = b'QCG1'
+BINARY_VERSION = 3
+# version, nodes, edges, subjects, components, string table bytes, flags
+_HEADER = struct.Struct('<4s7I')
+# Flag bit: x/y position columns follow the edge columns
+HAS_POSITIONS = 1
+
+
+def _write_array(f, items, encode):
+    f.write('[')
+    first = True
+    for item in items:
+        if not first:
+            f.write(',')
+        f.write(encode(item))
+        first = False
+    f.write(']')
+
+
+def write_json_stream(path, nodes, edges, components, statistics):
+    """Write graph.json one node/edge at a time.
+
+    `nodes` and `edges` may be generators; only one record is encoded at a
+    time, so memory stays flat regardless of graph size.
+    """
+    encode = _encoder.encode
+    with open(path, 'w') as f:
+        f.write('{"nodes":')
+        _write_array(f, nodes, encode)
+        f.write(',"edges":')
+        _write_array(f, edges, encode)
+        f.write(',"components":')
+        f.write(encode(components))
+        f.write(',"statistics":')
+        f.write(encode(statistics))
+        f.write('}')
+
+
+def write_ndjson(path, nodes, edges, components, statistics):
+    """Write the graph as newline-delimited JSON records.
+
+    One `{"statistics": ...}` line comes first, then one `{"node": ...}` or
+    `{"edge": ...}` line per record and one `{"component": [...]}` line per
+    component, so readers can process the file line by line.
+    """
+    encode = _encoder.encode
+    with open(path, 'w') as f:
+        f.write(encode({'statistics': statistics}) + '\n')
+        for node in nodes:
+            f.write(encode({'node': node}) + '\n')
+        for edge in edges:
+            f.write(encode({'edge': edge}) + '\n')
+        for component in components['all']:
+            f.write(encode({'component': component}) + '\n')
+
+
+def _padding(length):
+    return b'\0' * (-length % 4)
+
+
+def _column(typecode, values):
+    column = array(typecode, values)
+    if sys.byteorder == 'big':
+        column.byteswap()
+    return column.tobytes()
+
+
+def write_binary(path, graph, components, positions=None):
+    """Write a CourseGraph as a columnar binary file for the browser.
+
+    Layout (little-endian): a header of magic b'QCG1' and seven uint32s
+    (version, node count, edge count, subject count, component count,
+    string table bytes, flags); a UTF-8 string table of newline-separated
+    subjects, then per node its code, name and comma-separated prerequisites;
+    then the columns units float32[n], followupCount uint32[n],
+    component uint32[n], edge sources uint32[e], edge targets uint32[e],
+    x float32[n] and y float32[n] (only with the HAS_POSITIONS flag, from
+    `positions`, a sequence of (x, y) pairs), level uint16[n] and
+    subject uint16[n]. Every section starts on a 4-byte boundary so each
+    column can be viewed as a typed array without copying.
+    """
+    n = len(graph)
+    component_of = array('I', bytes(4 * n))
+    for c, component in enumerate(components):
+        for i in component:
+            component_of[i] = c
+    followups = (graph.followup_count(i) for i in range(n))
+    write_columns(path, graph.courses, followups, component_of, len(components),
+                  graph.edge_sources, graph.edge_targets, positions)
+
+
+def write_columns(path, courses, followups, component_of, component_count, sources, targets,
+                  positions=None):
+    """Write graph.bin from per-node columns (see write_binary) for `courses` in order"""
+    subjects = sorted({course['subject'] for course in courses})
+    subject_index = {subject: i for i, subject in enumerate(subjects)}
+
+    strings = list(subjects)
+    strings += [course['code'] for course in courses]
+    strings += [' '.join(course['name'].split()) for course in courses]
+    strings += [','.join(course['prerequisites']) for course in courses]
+    table = '\n'.join(strings).encode('utf-8')
+
+    with open(path, 'wb') as f:
+        f.write(_HEADER.pack(BINARY_MAGIC, BINARY_VERSION, len(courses), len(sources),
+                             len(subjects), component_count, len(table),
+                             HAS_POSITIONS if positions is not None else 0))
+        f.write(table + _padding(len(table)))
+        f.write(_column('f', (course['units'] for course in courses)))
+        f.write(_column('I', followups))
+        f.write(_column('I', component_of))
+        f.write(_column('I', sources))
+        f.write(_column('I', targets))
+        if positions is not None:
+            f.write(_column('f', (x for x, y in positions)))
+            f.write(_column('f', (y for x, y in positions)))
+        levels = _column('H', (course['level'] for course in courses))
+        f.write(levels + _padding(len(levels)))
+        f.write(_column('H', (subject_index[course['subject']] for course in courses)))
+
+
+def read_columns(path):
+    """The columns of a graph.bin file, without building node or edge dicts.
+
+    Returns a dict with the string lists `subjects`, `codes`, `names` and
+    `prerequisites` (comma-separated per node), the arrays `units`,
+    `followups`, `component_of`, `sources`, `targets`, `levels` and
+    `subject_ids`, `x` and `y` (None without positions) and
+    `component_count`.
+    """
+    with open(path, 'rb') as f:
+        data = f.read()
+
+    magic, version, n, e, subject_count, component_count, table_bytes, flags = _HEADER.unpack_from(data)
+    if magic != BINARY_MAGIC or version != BINARY_VERSION:
+        raise ValueError(f"{path} is not a version {BINARY_VERSION} graph.bin file")
+
+    offset = _HEADER.size
+    strings = data[offset:offset + table_bytes].decode('utf-8').split('\n')
+    offset += table_bytes + len(_padding(table_bytes))
+
+    def column(typecode, count):
+        nonlocal offset
+        values = array(typecode)
+        values.frombytes(data[offset:offset + values.itemsize * count])
+        if sys.byteorder == 'big':
+            values.byteswap()
+        offset += values.itemsize * count
+        offset += len(_padding(offset))
+        return values
+
+    columns = {
+        'subjects': strings[:subject_count],
+        'codes': strings[subject_count:subject_count + n],
+        'names': strings[subject_count + n:subject_count + 2 * n],
+        'prerequisites': strings[subject_count + 2 * n:subject_count + 3 * n],
+        'component_count': component_count,
+    }
+    columns['units'] = column('f', n)
+    columns['followups'] = column('I', n)
+    columns['component_of'] = column('I', n)
+    columns['sources'] = column('I', e)
+    columns['targets'] = column('I', e)
+    columns['x'] = column('f', n) if flags & HAS_POSITIONS else None
+    columns['y'] = column('f', n) if flags & HAS_POSITIONS else None
+    columns['levels'] = column('H', n)
+    columns['subject_ids'] = column('H', n)
+    return columns
+
+
+def read_binary(path):
+    """Read a graph.bin file back into the graph.json document shape.
+
+    graph.bin has no requirement trees, so nodes come back without
+    `requirements`, with only their flat prerequisites.
+    """
+    columns = read_columns(path)
+    subjects, codes, names, prereqs = (columns['subjects'], columns['codes'],
+                                       columns['names'], columns['prerequisites'])
+    units, levels, subject_ids = columns['units'], columns['levels'], columns['subject_ids']
+    followups = columns['followups']
+    n = len(codes)
+
+    nodes = [
+        course_node({
+            'code': codes[i],
+            'name': names[i],
+            'subject': subjects[subject_ids[i]],
+            'units': units[i],
+            'level': levels[i],
+            'prerequisites': prereqs[i].split(',') if prereqs[i] else [],
+        }, followups[i])
+        for i in range(n)
+    ]
+    if columns['x'] is not None:
+        for node, x, y in zip(nodes, columns['x'], columns['y']):
+            node['x'] = round(x, 1)
+            node['y'] = round(y, 1)
+    ids = [node_id(code) for code in codes]
+    edges = [
+        {'source': ids[s], 'target': ids[t], 'type': 'prerequisite'}
+        for s, t in zip(columns['sources'], columns['targets'])
+    ]
+
+    components = [[] for _ in range(columns['component_count'])]
+    for i, c in enumerate(columns['component_of']):
+        components[c].append(ids[i])
+    main_component = components[0] if components else []
+    isolated_nodes = [comp[0] for comp in components if len(comp) == 1]
+
+    return {
+        'nodes': nodes,
+        'edges': edges,
+        'components': {
+            'main': main_component,
+            'isolated': isolated_nodes,
+            'all': components
+        },
+        'statistics': {
+            'total_nodes': n,
+            'total_edges': len(edges),
+            'component_count': len(components),
+            'largest_component_size': len(main_component),
+            'isolated_count': len(isolated_nodes)
+        }
+    }
@@ -0,0 +1,314 @@
+import hashlib
+import json
+from array import array
+from collections import Counter, defaultdict
+
+from course_graph import course_node, node_id
+
+
+# Canonical encoding for hashing; reused so every call skips encoder setup
+_canonical = json.JSONEncoder(sort_keys=True, separators=(',', ':'))
+
+
+def course_hash(course):
+    """Content hash of a single course record"""
+    return hashlib.sha1(_canonical.encode(course).encode('utf-8')).hexdigest()
+
+
+def build_state(courses):
+    """Bookkeeping needed by the next incremental build.
+
+    Stores a content hash per course and, for prerequisites that are not
+    courses in this build, the courses that mention them. The latter lets an
+    added course pick up its follow-ups without scanning every course.
+    """
+    codes = {course['code'] for course in courses}
+    dangling = defaultdict(set)
+    for course in courses:
+        for prereq in course['prerequisites']:
+            if prereq not in codes:
+                dangling[prereq].add(course['code'])
+    return {
+        'hashes': {course['code']: course_hash(course) for course in courses},
+        'dangling': {prereq: sorted(dangling[prereq]) for prereq in sorted(dangling)},
+    }
+
+
+def diff_courses(hashes, courses):
+    """Compare `courses` against the per-course hashes of the previous build"""
+    new_hashes = {}
+    added = []
+    changed = []
+    for course in courses:
+        code = course['code']
+        digest = course_hash(course)
+        new_hashes[code] = digest
+        old = hashes.get(code)
+        if old is None:
+            added.append(code)
+        elif old != digest:
+            changed.append(code)
+    removed = [code for code in hashes if code not in new_hashes]
+    return added, changed, removed, new_hashes
+
+
+class IncrementalBuild:
+    """Apply a courses.json update to the previous build.
+
+    The previous graph comes from the columns of its graph.bin: edges,
+    component labels, prerequisite strings and positions, with no node
+    dicts. Only the nodes, edges and follow-up counts of changed courses
+    (and of the courses whose prerequisites they satisfy) are touched.
+    Components are kept in a union-find keyed by component label: added
+    edges merge labels, while a component that loses an edge or a node is
+    re-split with a BFS over its own members only.
+    """
+
+    def __init__(self, previous, state):
+        self.previous = previous
+        ids = [node_id(code) for code in previous['codes']]
+        self.codes = dict(zip(ids, previous['codes']))
+        self.old_index = {node_id: i for i, node_id in enumerate(ids)}
+        self.in_edges = defaultdict(list)
+        self.out_edges = defaultdict(list)
+        for s, t in zip(previous['sources'], previous['targets']):
+            self.in_edges[ids[t]].append(ids[s])
+            self.out_edges[ids[s]].append(ids[t])
+
+        self.hashes = state['hashes']
+        self.dangling = defaultdict(set)
+        for prereq, dependents in state['dangling'].items():
+            self.dangling[prereq].update(dependents)
+
+        self.label = dict(zip(ids, previous['component_of']))
+        members = defaultdict(set)
+        for i, k in self.label.items():
+            members[k].add(i)
+        self.members = dict(members)
+        self.next_label = previous['component_count']
+
+        self.added_edges = []
+        self.removed_edges = []
+        self.split = set()
+
+    def _old_prerequisites(self, i):
+        k = self.old_index.get(i)
+        if k is None:
+            return []
+        prereqs = self.previous['prerequisites'][k]
+        return prereqs.split(',') if prereqs else []
+
+    def position(self, i):
+        """Previous (x, y) of node `i`, or None"""
+        k = self.old_index.get(i)
+        if k is None or self.previous['x'] is None:
+            return None
+        return round(self.previous['x'][k], 1), round(self.previous['y'][k], 1)
+
+    def node(self, course):
+        """graph.json node dict of `course` after `apply`, at its previous position if it had one"""
+        i = node_id(course['code'])
+        node = course_node(course, len(self.out_edges.get(i, ())))
+        position = self.position(i)
+        if position is not None:
+            node['x'], node['y'] = position
+        return node
+
+    def _new_label(self, members):
+        k = self.next_label
+        self.next_label += 1
+        self.members[k] = members
+        for i in members:
+            self.label[i] = k
+        return k
+
+    def _union(self, a, b):
+        ka, kb = self.label[a], self.label[b]
+        if ka == kb:
+            return
+        if len(self.members[ka]) < len(self.members[kb]):
+            ka, kb = kb, ka
+        moved = self.members.pop(kb)
+        for i in moved:
+            self.label[i] = ka
+        self.members[ka] |= moved
+
+    def _remove_course(self, code):
+        rid = node_id(code)
+        for source in self.in_edges.pop(rid, []):
+            self.out_edges[source].remove(rid)
+            self.removed_edges.append((source, rid))
+        for target in self.out_edges.pop(rid, []):
+            self.in_edges[target].remove(rid)
+            self.removed_edges.append((rid, target))
+            # The follow-up still lists this course; it is now dangling
+            self.dangling[code].add(self.codes[target])
+        for prereq in self._old_prerequisites(rid):
+            if prereq in self.dangling:
+                self.dangling[prereq].discard(code)
+                if not self.dangling[prereq]:
+                    del self.dangling[prereq]
+
+        k = self.label.pop(rid)
+        self.members[k].discard(rid)
+        self.split.add(k)
+
+    def _relink_course(self, course, known):
+        """Recompute the incoming edges of `course` from its prerequisites"""
+        code = course['code']
+        tid = node_id(code)
+        for prereq in self._old_prerequisites(tid):
+            if prereq in self.dangling:
+                self.dangling[prereq].discard(code)
+                if not self.dangling[prereq]:
+                    del self.dangling[prereq]
+
+        sources = []
+        for prereq in course['prerequisites']:
+            if prereq in known:
+                sources.append(node_id(prereq))
+            else:
+                self.dangling[prereq].add(code)
+
+        old_sources = Counter(self.in_edges.get(tid, []))
+        new_sources = Counter(sources)
+        for source, count in (old_sources - new_sources).items():
+            for _ in range(count):
+                self.out_edges[source].remove(tid)
+                self.removed_edges.append((source, tid))
+            self.split.add(self.label[source])
+        for source, count in (new_sources - old_sources).items():
+            for _ in range(count):
+                self.out_edges[source].append(tid)
+                self.added_edges.append((source, tid))
+        self.in_edges[tid] = sources
+        self.codes[tid] = code
+
+    def _resplit(self, k):
+        """Recompute the components inside a former component `k`"""
+        remaining = self.members.pop(k, set())
+        while remaining:
+            start = remaining.pop()
+            component = [start]
+            head = 0
+            while head < len(component):
+                current = component[head]
+                head += 1
+                for neighbor in self.out_edges.get(current, ()):
+                    if neighbor in remaining:
+                        remaining.discard(neighbor)
+                        component.append(neighbor)
+                for neighbor in self.in_edges.get(current, ()):
+                    if neighbor in remaining:
+                        remaining.discard(neighbor)
+                        component.append(neighbor)
+            self._new_label(set(component))
+
+    def apply(self, courses):
+        """Update the graph to match `courses` and return a patch of the changes"""
+        added, changed, removed, hashes = diff_courses(self.hashes, courses)
+        by_code = {course['code']: course for course in courses}
+
+        for code in removed:
+            self._remove_course(code)
+
+        relink = set(added) | set(changed)
+        for code in added:
+            self._new_label({node_id(code)})
+            relink.update(self.dangling.pop(code, ()))
+        for code in sorted(relink):
+            self._relink_course(by_code[code], by_code)
+
+        touched = set(relink)
+        for source, target in self.added_edges + self.removed_edges:
+            touched.add(self.codes[source])
+        touched &= by_code.keys()
+
+        for k in self.split:
+            self._resplit(k)
+        for source, target in self.added_edges:
+            self._union(source, target)
+
+        self.hashes = hashes
+        return {
+            'nodes': {
+                'added': [node_id(code) for code in added],
+                'removed': [node_id(code) for code in removed],
+                'updated': [self.node(by_code[code]) for code in sorted(touched, key=node_id)],
+            },
+            'edges': {
+                'added': [{'source': s, 'target': t, 'type': 'prerequisite'} for s, t in self.added_edges],
+                'removed': [{'source': s, 'target': t, 'type': 'prerequisite'} for s, t in self.removed_edges],
+            },
+        }
+
+    def components(self, ids):
+        """Component id lists after `apply`, largest first, for nodes `ids` in order"""
+        # Members in node order and ties broken by first member, so the
+        # output does not depend on set iteration order
+        position = {node_id: k for k, node_id in enumerate(ids)}
+        components = [sorted(m, key=position.__getitem__) for m in self.members.values()]
+        components.sort(key=lambda comp: (-len(comp), position[comp[0]]))
+        return components
+
+    def output(self, courses):
+        """The full graph.json document after `apply`"""
+        nodes = [self.node(course) for course in courses]
+        edges = [
+            {'source': source, 'target': node['id'], 'type': 'prerequisite'}
+            for node in nodes
+            for source in self.in_edges.get(node['id'], [])
+        ]
+        components = self.components([node['id'] for node in nodes])
+        main_component = components[0] if components else []
+        isolated_nodes = [comp[0] for comp in components if len(comp) == 1]
+
+        return {
+            'nodes': nodes,
+            'edges': edges,
+            'components': {
+                'main': main_component,
+                'isolated': isolated_nodes,
+                'all': components
+            },
+            'statistics': {
+                'total_nodes': len(nodes),
+                'total_edges': len(edges),
+                'component_count': len(components),
+                'largest_component_size': len(main_component),
+                'isolated_count': len(isolated_nodes)
+            }
+        }
+
+    def columns(self, courses):
+        """graph.bin columns after `apply`, as keyword arguments for graph_formats.write_columns"""
+        ids = [node_id(course['code']) for course in courses]
+        index = {node_id: k for k, node_id in enumerate(ids)}
+        sources = array('I')
+        targets = array('I')
+        for t, i in enumerate(ids):
+            for source in self.in_edges.get(i, ()):
+                sources.append(index[source])
+                targets.append(t)
+
+        components = self.components(ids)
+        component_of = array('I', bytes(4 * len(ids)))
+        for c, component in enumerate(components):
+            for i in component:
+                component_of[index[i]] = c
+
+        positions = [self.position(i) for i in ids]
+        return {
+            'followups': [len(self.out_edges.get(i, ())) for i in ids],
+            'component_of': component_of,
+            'component_count': len(components),
+            'sources': sources,
+            'targets': targets,
+            'positions': None if None in positions else positions,
+        }
+
+    def state(self):
+        return {
+            'hashes': self.hashes,
+            'dangling': {prereq: sorted(self.dangling[prereq]) for prereq in sorted(self.dangling)},
+        }
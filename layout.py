@@ -0,0 +1,237 @@
+import math
+
+import numpy as np
+
+# Force parameters documented in the README; index.html's FORCES uses the
+# same values, so dragging or resetting a precomputed layout keeps its shape
+LINK_DISTANCE = 60.0
+LINK_STRENGTH = 0.8
+CHARGE_STRENGTH = -200.0
+COLLISION_PADDING = 3.0
+CENTER_STRENGTH = 0.05
+ALPHA_DECAY = 0.01
+ALPHA_MIN = 0.001
+VELOCITY_DECAY = 0.4
+# Largest distance a node may move in one tick; keeps a hub whose links all
+# pull the same way from overshooting and flinging it (and the layout's
+# extent) out by orders of magnitude in the first hot ticks
+MAX_STEP = LINK_DISTANCE
+# Starting alpha when refining a previous layout after a small change
+WARM_START_ALPHA = 0.3
+
+
+def node_radius(units):
+    """Same as getNodeSize in index.html"""
+    return 6 + units * 1.5
+
+
+def phyllotaxis(n):
+    """d3-force's initial placement, so layouts start where the page would"""
+    i = np.arange(n)
+    radius = 10 * np.sqrt(0.5 + i)
+    angle = i * math.pi * (3 - math.sqrt(5))
+    return np.column_stack((radius * np.cos(angle), radius * np.sin(angle)))
+
+
+def seed_positions(graph, nodes):
+    """Initial positions for a warm start from graph.json node dicts.
+
+    Courses keep their previous `x`/`y`; new courses start at the mean of
+    their positioned neighbours, or on the d3 spiral if they have none.
+    """
+    n = len(graph)
+    pos = phyllotaxis(n)
+    known = np.zeros(n, dtype=bool)
+    previous = {node['id']: node for node in nodes if 'x' in node}
+    for i, node_id in enumerate(graph.ids):
+        node = previous.get(node_id)
+        if node is not None:
+            pos[i] = node['x'], node['y']
+            known[i] = True
+
+    rng = np.random.RandomState(0)
+    for i in np.flatnonzero(~known):
+        neighbours = [j for j in list(graph.prerequisites(i)) + list(graph.followups(i)) if known[j]]
+        if neighbours:
+            pos[i] = pos[neighbours].mean(axis=0) + rng.uniform(-LINK_DISTANCE / 4, LINK_DISTANCE / 4, 2)
+    return pos
+
+
+def near_pairs(pos, cell):
+    """Index pairs (i, j), i != j, of points in the same or adjacent grid cells.
+
+    Points are bucketed into square cells of `cell` on a side; each
+    unordered pair is returned once by visiting only half of the 3x3
+    neighbourhood. Only occupied cells are stored (sorted cell keys), so
+    memory and time follow the number of points, not the layout's extent.
+    """
+    n = len(pos)
+    cells = np.floor((pos - pos.min(axis=0)) / cell).astype(np.int64) + 1
+    width = int(cells[:, 1].max()) + 2
+    keys = cells[:, 0] * width + cells[:, 1]
+    order = np.argsort(keys, kind='stable')
+    occupied, starts, counts = np.unique(keys[order], return_index=True, return_counts=True)
+
+    sources = []
+    targets = []
+    for dx, dy in ((0, 0), (1, -1), (1, 0), (1, 1), (0, 1)):
+        neighbour = keys + dx * width + dy
+        slot = np.minimum(np.searchsorted(occupied, neighbour), len(occupied) - 1)
+        found = np.where(occupied[slot] == neighbour, counts[slot], 0)
+        total = int(found.sum())
+        if total == 0:
+            continue
+        i = np.repeat(np.arange(n), found)
+        first = np.repeat(np.cumsum(found) - found, found)
+        j = order[np.arange(total) - first + np.repeat(starts[slot], found)]
+        if dx == 0 and dy == 0:
+            keep = i < j
+            i, j = i[keep], j[keep]
+        sources.append(i)
+        targets.append(j)
+
+    if not sources:
+        empty = np.zeros(0, dtype=np.intp)
+        return empty, empty
+    return np.concatenate(sources), np.concatenate(targets)
+
+
+class _ChargeGrid:
+    """Many-body repulsion on a particle mesh.
+
+    Node charge is spread onto a G x G grid (cloud-in-cell), convolved by FFT
+    with the 2-D Coulomb kernel d / |d|^2 that d3.forceManyBody uses, and
+    interpolated back to the nodes. Cost per tick is O(n + G^2 log G)
+    instead of O(n^2); the kernel is softened below one grid cell, which the
+    collision force covers.
+    """
+
+    def __init__(self, size):
+        self.size = size
+        k = np.arange(2 * size)
+        k = np.where(k < size, k, k - 2 * size).astype(float)
+        dx, dy = np.meshgrid(k, k, indexing='ij')
+        r2 = dx * dx + dy * dy
+        r2[0, 0] = 1.0
+        # Field at p from unit charge at q is (q - p) / |q - p|^2; this is the
+        # kernel for one-cell spacing and scales with 1/h
+        kx = np.where(r2 > 0, -dx / r2, 0.0)
+        ky = np.where(r2 > 0, -dy / r2, 0.0)
+        kx[0, 0] = ky[0, 0] = 0.0
+        self.kernel_x = np.fft.rfft2(kx)
+        self.kernel_y = np.fft.rfft2(ky)
+
+    def _weights(self, pos, lo, h):
+        g = self.size
+        u = (pos - lo) / h - 0.5
+        base = np.floor(u).astype(np.int64)
+        frac = u - base
+        corners = []
+        for ox in (0, 1):
+            wx = frac[:, 0] if ox else 1 - frac[:, 0]
+            ix = np.clip(base[:, 0] + ox, 0, g - 1)
+            for oy in (0, 1):
+                wy = frac[:, 1] if oy else 1 - frac[:, 1]
+                iy = np.clip(base[:, 1] + oy, 0, g - 1)
+                corners.append((ix * g + iy, wx * wy))
+        return corners
+
+    def field(self, pos):
+        g = self.size
+        lo = pos.min(axis=0)
+        span = float((pos.max(axis=0) - lo).max())
+        h = max(span, 1.0) / (g - 2)
+        lo = lo - h
+        corners = self._weights(pos, lo, h)
+
+        charge = np.zeros(g * g)
+        for index, weight in corners:
+            charge += np.bincount(index, weight, minlength=g * g)
+        charge_hat = np.fft.rfft2(charge.reshape(g, g), s=(2 * g, 2 * g))
+        fx = np.fft.irfft2(charge_hat * self.kernel_x, s=(2 * g, 2 * g))[:g, :g].ravel() / h
+        fy = np.fft.irfft2(charge_hat * self.kernel_y, s=(2 * g, 2 * g))[:g, :g].ravel() / h
+
+        out = np.zeros_like(pos)
+        for index, weight in corners:
+            out[:, 0] += fx[index] * weight
+            out[:, 1] += fy[index] * weight
+        return out
+
+
+def layout(graph, initial=None, alpha=1.0, link_distance=LINK_DISTANCE,
+           link_strength=LINK_STRENGTH, charge_strength=CHARGE_STRENGTH,
+           collision_padding=COLLISION_PADDING, center_strength=CENTER_STRENGTH,
+           alpha_decay=ALPHA_DECAY, alpha_min=ALPHA_MIN, max_step=MAX_STEP, grid_size=None):
+    """Force-directed x/y positions for every course in a CourseGraph.
+
+    Mirrors d3-force's tick (link, many-body, collision and x/y forces, then
+    velocity decay) with the README's parameters. Pass `initial` positions
+    and a lower `alpha` to warm-start from a previous layout. Returns an
+    (n, 2) array centred on the origin.
+    """
+    n = len(graph)
+    if n == 0:
+        return np.zeros((0, 2))
+    rng = np.random.RandomState(0)
+    pos = phyllotaxis(n) if initial is None else np.array(initial, dtype=float)
+    vel = np.zeros_like(pos)
+
+    sources = np.frombuffer(graph.edge_sources, dtype=np.int32).astype(np.intp)
+    targets = np.frombuffer(graph.edge_targets, dtype=np.int32).astype(np.intp)
+    degree = np.bincount(sources, minlength=n) + np.bincount(targets, minlength=n)
+    bias = degree[sources] / np.maximum(degree[sources] + degree[targets], 1)
+
+    radius = node_radius(np.array([course['units'] for course in graph.courses], dtype=float))
+    radius += collision_padding
+    radius2 = radius * radius
+
+    if grid_size is None:
+        grid_size = int(min(256, max(32, 2 ** math.ceil(math.log2(math.sqrt(n))))))
+    charges = _ChargeGrid(grid_size)
+
+    while alpha >= alpha_min:
+        # Links: pull each edge towards its rest length
+        if len(sources):
+            d = pos[targets] + vel[targets] - pos[sources] - vel[sources]
+            length = np.hypot(d[:, 0], d[:, 1])
+            length = np.where(length == 0, 1e-6, length)
+            d *= ((length - link_distance) / length * alpha * link_strength)[:, None]
+            for axis in (0, 1):
+                vel[:, axis] -= np.bincount(targets, d[:, axis] * bias, minlength=n)
+                vel[:, axis] += np.bincount(sources, d[:, axis] * (1 - bias), minlength=n)
+
+        # Many-body repulsion
+        vel += charges.field(pos) * (charge_strength * alpha)
+
+        # Collisions between nodes in neighbouring cells
+        predicted = pos + vel
+        i, j = near_pairs(predicted, 2 * radius.max())
+        if len(i):
+            d = predicted[i] - predicted[j]
+            reach = radius[i] + radius[j]
+            dist2 = (d * d).sum(axis=1)
+            hit = dist2 < reach * reach
+            i, j, d, reach, dist2 = i[hit], j[hit], d[hit], reach[hit], dist2[hit]
+            zero = dist2 == 0
+            if zero.any():
+                d[zero] = rng.uniform(-1e-6, 1e-6, (int(zero.sum()), 2))
+                dist2[zero] = (d[zero] * d[zero]).sum(axis=1)
+            length = np.sqrt(dist2)
+            d *= ((reach - length) / length)[:, None]
+            share = radius2[j] / (radius2[i] + radius2[j])
+            for axis in (0, 1):
+                vel[:, axis] += np.bincount(i, d[:, axis] * share, minlength=n)
+                vel[:, axis] -= np.bincount(j, d[:, axis] * (1 - share), minlength=n)
+
+        # Gentle pull towards the centre
+        vel -= pos * (center_strength * alpha)
+
+        vel *= 1 - VELOCITY_DECAY
+        speed = np.hypot(vel[:, 0], vel[:, 1])
+        fast = speed > max_step
+        if fast.any():
+            vel[fast] *= (max_step / speed[fast])[:, None]
+        pos += vel
+        alpha += (0 - alpha) * alpha_decay
+
+    return pos - pos.mean(axis=0)
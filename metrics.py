@@ -0,0 +1,125 @@
+import cProfile
+import json
+import sys
+import time
+import tracemalloc
+from contextlib import contextmanager
+from datetime import datetime, timezone
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+# Allocation sites listed in the metrics file when tracing memory
+TOP_ALLOCATIONS = 25
+
+
+def max_rss_bytes():
+    """Peak resident set size of this process, or None where it is unavailable"""
+    if resource is None:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # kilobytes on Linux, bytes on macOS
+    return rss if sys.platform == 'darwin' else rss * 1024
+
+
+class Metrics:
+    """Stage timings, counters and memory snapshots for one script run.
+
+    Recording is always on and costs a couple of clock reads per stage;
+    nothing is written unless `save` is called. With `trace_memory`,
+    tracemalloc runs for the whole run, so every stage also reports traced
+    Python allocations (current and peak) and the file lists the top
+    allocation sites.
+    """
+
+    def __init__(self, command, trace_memory=False):
+        self.command = command
+        self.started = datetime.now(timezone.utc).isoformat(timespec='seconds')
+        self.start = time.perf_counter()
+        self.stages = []
+        self.counters = {}
+        self.trace_memory = trace_memory
+        if trace_memory:
+            tracemalloc.start()
+
+    @contextmanager
+    def stage(self, name):
+        """Time the enclosed block and snapshot memory when it ends"""
+        if self.trace_memory:
+            tracemalloc.reset_peak()
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            record = {
+                'name': name,
+                'seconds': time.perf_counter() - start,
+                'max_rss_bytes': max_rss_bytes(),
+            }
+            if self.trace_memory:
+                current, peak = tracemalloc.get_traced_memory()
+                record['traced_bytes'] = current
+                record['traced_peak_bytes'] = peak
+            self.stages.append(record)
+
+    def count(self, name, value=1):
+        self.counters[name] = self.counters.get(name, 0) + value
+
+    def to_dict(self):
+        data = {
+            'command': self.command,
+            'started': self.started,
+            'total_seconds': time.perf_counter() - self.start,
+            'max_rss_bytes': max_rss_bytes(),
+            'stages': self.stages,
+            'counters': self.counters,
+        }
+        if self.trace_memory:
+            top = tracemalloc.take_snapshot().statistics('lineno')[:TOP_ALLOCATIONS]
+            data['allocations'] = [
+                {'location': f'{stat.traceback[0].filename}:{stat.traceback[0].lineno}',
+                 'bytes': stat.size, 'count': stat.count}
+                for stat in top
+            ]
+        return data
+
+    def save(self, path):
+        with open(path, 'w') as f:
+            json.dump(self.to_dict(), f, indent=2)
+
+
+def add_metrics_arguments(parser):
+    """--metrics, --trace-memory and --profile options shared by the scripts"""
+    parser.add_argument('--metrics', metavar='FILE',
+                        help='write stage timings, counters and memory snapshots as JSON')
+    parser.add_argument('--trace-memory', action='store_true',
+                        help='with --metrics, trace Python allocations per stage (slower)')
+    parser.add_argument('--profile', metavar='FILE',
+                        help='write cProfile stats (open with pstats or snakeviz)')
+
+
+@contextmanager
+def instrumented(command, args):
+    """Metrics for a script run configured by `add_metrics_arguments` options.
+
+    Yields a Metrics; on exit writes the metrics and profile files that
+    were asked for.
+    """
+    metrics = Metrics(command, trace_memory=args.trace_memory)
+    profiler = cProfile.Profile() if args.profile else None
+    if profiler:
+        profiler.enable()
+    try:
+        yield metrics
+    finally:
+        if profiler:
+            profiler.disable()
+            profiler.dump_stats(args.profile)
+            print(f"Profile saved to {args.profile}")
+        if args.metrics:
+            metrics.save(args.metrics)
+            print(f"Metrics saved to {args.metrics}")
+        if metrics.trace_memory:
+            tracemalloc.stop()
@@ -0,0 +1,277 @@
+import argparse
+import json
+import math
+import sys
+import time
+
+from course_graph import CourseGraph
+from prerequisites import AND, OR
+
+
+class DegreePlanner:
+    """Minimum-term course schedules over the prerequisite graph.
+
+    Each course's AND/OR requirement tree decides what it needs: every
+    branch of an `and`, and one branch of an `or`, picked before scheduling
+    (one already completed, else the one with the shortest prerequisite
+    chain, then the fewest courses). A plan takes each course in a term after
+    its chosen prerequisites and keeps every term within the unit cap.
+    """
+
+    def __init__(self, graph):
+        self.graph = graph
+        self.lookup = dict(graph.index)
+        self.lookup.update((node_id, i) for i, node_id in enumerate(graph.ids))
+
+    @classmethod
+    def load(cls, path):
+        """Planner over a graph.json written by build_graph.py"""
+        with open(path, 'r') as f:
+            data = json.load(f)
+        return cls(CourseGraph(data['nodes']))
+
+    def resolve(self, codes):
+        """Graph indexes for course codes given as 'MATH 110' or 'MATH110'"""
+        unknown = [code for code in codes if code not in self.lookup]
+        if unknown:
+            raise ValueError(f"Unknown course(s): {', '.join(unknown)}")
+        return [self.lookup[code] for code in codes]
+
+    def choose(self, tree, done, cost):
+        """Courses not in `done` that meet `tree`, taking the cheapest branch of each `or`"""
+        if tree is None:
+            return []
+        if isinstance(tree, str):
+            i = self.graph.index[tree]
+            return [] if i in done else [i]
+        if AND in tree:
+            return [i for child in tree[AND] for i in self.choose(child, done, cost)]
+        options = [self.choose(child, done, cost) for child in tree[OR]]
+        return min(options, key=lambda option: (max((cost(i)[0] for i in option), default=0),
+                                                sum(cost(i)[1] for i in option)))
+
+    def required(self, targets, completed):
+        """Targets plus the prerequisites they need, as (needed, chosen prerequisites per course)"""
+        done = set(completed)
+        costs = {}
+
+        def cost(i):
+            """(longest chain, course count) to take course `i` from `done`"""
+            if i not in costs:
+                costs[i] = (math.inf, math.inf)  # a cycle is never the cheapest branch
+                chosen = self.choose(self.graph.requirements(i), done, cost)
+                costs[i] = (1 + max((cost(p)[0] for p in chosen), default=0),
+                            1 + sum(cost(p)[1] for p in chosen))
+            return costs[i]
+
+        needed = []
+        prerequisites = {}
+        stack = [i for i in targets if i not in done]
+        while stack:
+            i = stack.pop()
+            if i in prerequisites:
+                continue
+            prerequisites[i] = self.choose(self.graph.requirements(i), done, cost)
+            needed.append(i)
+            for p in prerequisites[i]:
+                if p not in prerequisites:
+                    stack.append(p)
+        return needed, prerequisites
+
+    def plan(self, targets, completed=(), max_units=15.0, max_terms=8):
+        """Term-by-term plan (lists of course codes) using as few terms as possible.
+
+        Returns None when no plan fits in `max_terms` terms. If the exact
+        search runs out of steps (_Schedule.MAX_STEPS) the greedy plan is
+        returned instead, which may take more terms than necessary.
+        """
+        target_ids = self.resolve(targets)
+        completed_ids = self.resolve(completed)
+        needed, prerequisites = self.required(target_ids, completed_ids)
+        if not needed:
+            return []
+
+        courses = self.graph.courses
+        too_big = [courses[i]['code'] for i in needed if courses[i]['units'] > max_units]
+        if too_big:
+            raise ValueError(f"Course(s) exceed the {max_units} unit cap: {', '.join(too_big)}")
+
+        schedule = _Schedule(self.graph, needed, prerequisites, max_units)
+        terms = schedule.solve(max_terms)
+        if terms is None:
+            return None
+        return [[courses[needed[k]]['code'] for k in term] for term in terms]
+
+
+class _OutOfSteps(Exception):
+    pass
+
+
+class _Schedule:
+    """Search state for one planning request over local course indexes.
+
+    Iterative deepening on the number of terms, starting from a lower bound
+    (longest remaining chain, remaining units over the cap). Each term takes
+    a maximal set of available courses: leaving out a course that still fits
+    can never shorten a plan. Subproblems are memoised per set of finished
+    courses as the largest term budget known to be infeasible.
+
+    The search is exponential in the worst case (many interchangeable
+    courses under a tight cap), so it is limited to MAX_STEPS steps; past
+    that the plan fills each term greedily in priority order instead.
+    """
+
+    # Term choices extended plus subproblems visited before giving up on the exact search
+    MAX_STEPS = 100000
+
+    def __init__(self, graph, needed, prerequisites, max_units):
+        local = {i: k for k, i in enumerate(needed)}
+        m = len(needed)
+        self.full = (1 << m) - 1
+        # Units in hundredths so capacity checks are exact
+        self.units = [round(graph.courses[i]['units'] * 100) for i in needed]
+        self.cap = round(max_units * 100)
+
+        self.prereq_mask = [0] * m
+        followups = [[] for _ in range(m)]
+        for k, i in enumerate(needed):
+            for p in prerequisites[i]:
+                if p in local:
+                    self.prereq_mask[k] |= 1 << local[p]
+                    followups[local[p]].append(k)
+
+        # Longest chain of required courses starting at each course
+        self.height = [0] * m
+        for k in self._topological(m, followups)[::-1]:
+            self.height[k] = 1 + max((self.height[f] for f in followups[k]), default=0)
+        # Longest chains first, then bigger courses, for greedy-first choices
+        self.priority = sorted(range(m), key=lambda k: (-self.height[k], -self.units[k], k))
+        self.infeasible = {}
+        self.steps = 0
+
+    def _topological(self, m, followups):
+        indegree = [bin(mask).count('1') for mask in self.prereq_mask]
+        order = [k for k in range(m) if indegree[k] == 0]
+        for k in order:
+            for f in followups[k]:
+                indegree[f] -= 1
+                if indegree[f] == 0:
+                    order.append(f)
+        if len(order) != m:
+            raise ValueError("Prerequisite cycle among the required courses")
+        return order
+
+    def lower_bound(self, done):
+        remaining = 0
+        longest = 0
+        for k in range(len(self.units)):
+            if not (done >> k) & 1:
+                remaining += self.units[k]
+                if self.height[k] > longest:
+                    longest = self.height[k]
+        return max(longest, math.ceil(remaining / self.cap))
+
+    def step(self):
+        self.steps += 1
+        if self.steps > self.MAX_STEPS:
+            raise _OutOfSteps
+
+    def term_choices(self, available):
+        """Maximal subsets of `available` (in priority order) within the cap"""
+        units = self.units
+        cap = self.cap
+        n = len(available)
+
+        def extend(k, chosen, used, min_skipped):
+            self.step()
+            if k == n:
+                if cap - used < min_skipped:
+                    yield chosen
+                return
+            course = available[k]
+            if used + units[course] <= cap:
+                yield from extend(k + 1, chosen | (1 << course), used + units[course], min_skipped)
+            yield from extend(k + 1, chosen, used, min(min_skipped, units[course]))
+
+        return extend(0, 0, 0, math.inf)
+
+    def search(self, done, terms_left):
+        self.step()
+        if done == self.full:
+            return []
+        if terms_left == 0 or self.infeasible.get(done, -1) >= terms_left:
+            return None
+        if self.lower_bound(done) > terms_left:
+            return None
+
+        available = [k for k in self.priority
+                     if not (done >> k) & 1 and self.prereq_mask[k] & done == self.prereq_mask[k]]
+        for chosen in self.term_choices(available):
+            rest = self.search(done | chosen, terms_left - 1)
+            if rest is not None:
+                return [chosen] + rest
+
+        self.infeasible[done] = terms_left
+        return None
+
+    def greedy(self, max_terms):
+        """Masks of terms that each take every available course that still fits, in priority order"""
+        done = 0
+        masks = []
+        while done != self.full and len(masks) < max_terms:
+            chosen = 0
+            used = 0
+            for k in self.priority:
+                if (not (done >> k) & 1 and self.prereq_mask[k] & done == self.prereq_mask[k]
+                        and used + self.units[k] <= self.cap):
+                    chosen |= 1 << k
+                    used += self.units[k]
+            done |= chosen
+            masks.append(chosen)
+        return masks if done == self.full else None
+
+    def solve(self, max_terms):
+        try:
+            for terms in range(self.lower_bound(0), max_terms + 1):
+                masks = self.search(0, terms)
+                if masks is not None:
+                    break
+            else:
+                return None
+        except _OutOfSteps:
+            masks = self.greedy(max_terms)
+            if masks is None:
+                return None
+        return [[k for k in range(len(self.units)) if (mask >> k) & 1] for mask in masks]
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Plan the fewest terms to reach a set of target courses')
+    parser.add_argument('targets', nargs='+', help="target course codes, e.g. 'MATH 418' or MATH418")
+    parser.add_argument('--completed', nargs='*', default=[], help='courses already completed')
+    parser.add_argument('--max-units', type=float, default=15.0, help='unit cap per term (default: 15.0)')
+    parser.add_argument('--max-terms', type=int, default=8, help='maximum number of terms (default: 8)')
+    parser.add_argument('--graph', default='graph.json', help='graph.json written by build_graph.py')
+    args = parser.parse_args(argv)
+
+    planner = DegreePlanner.load(args.graph)
+    start = time.perf_counter()
+    try:
+        terms = planner.plan(args.targets, args.completed, args.max_units, args.max_terms)
+    except ValueError as e:
+        parser.error(str(e))
+    elapsed = (time.perf_counter() - start) * 1000
+
+    if terms is None:
+        print(f"No plan fits in {args.max_terms} terms at {args.max_units} units per term ({elapsed:.1f} ms)")
+        sys.exit(1)
+
+    print(f"Plan in {len(terms)} term(s), found in {elapsed:.1f} ms:")
+    units = {course['code']: course['units'] for course in planner.graph.courses}
+    for t, term in enumerate(terms, 1):
+        total = sum(units[code] for code in term)
+        print(f"  Term {t} ({total} units): {', '.join(term)}")
+
+
+if __name__ == '__main__':
+    main()
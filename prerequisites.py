@@ -0,0 +1,252 @@
+import random
+import re
+import time
+
+# One alternation so a single findall pass tokenises the whole clause:
+# course code, number, word, punctuation. Without groups findall returns
+# plain strings, and tokenize tells them apart by their first and last
+# characters. Course codes are case-sensitive ("MATH 110"); words are
+# looked up in _WORDS. A number takes in its decimals and any "-level" or
+# "units" after it ("6.00 units of 300-level MATH"), so only a token of
+# exactly three digits can be a course.
+_TOKEN = re.compile(r'[A-Z]{4}\s*\d{3}\b'
+                    r'|\d+(?:\.\d+)?(?:\s*-?\s*(?i:level|units?)\b)?'
+                    r'|[A-Za-z]+|[,;&/()\[\]]')
+
+AND, OR, COMMA, OPEN, CLOSE, ONE_OF = 'and', 'or', ',', '(', ')', 'one of'
+# tokenize only: the previous token was a course code
+CODE = 'code'
+
+_WORDS = {'and': AND, 'or': OR, 'none': None, 'one': ONE_OF, 'any': ONE_OF}
+_PUNCTUATION = {',': COMMA, ';': AND, '&': AND, '/': OR,
+                '(': OPEN, '[': OPEN, ')': CLOSE, ']': CLOSE}
+
+
+def tokenize(text):
+    """Course codes and connectives of a prerequisite clause, in order.
+
+    A bare number right after a connective that follows a course code
+    inherits that code's subject, so "MATH 110 or 111" yields MATH 110 and
+    MATH 111. Anywhere else ("in 200-level MATH", "with 120 units") a bare
+    number is not a course.
+    """
+    tokens = []
+    subject = None
+    # CODE after a course code, COMMA after connectives ("," or ", or") that follow one
+    follows = None
+    one = False
+    for token in _TOKEN.findall(text):
+        if token in _PUNCTUATION:
+            kind = _PUNCTUATION[token]
+            tokens.append(kind)
+            if kind is OPEN or kind is CLOSE:
+                follows = None
+            elif follows is not None:
+                follows = COMMA
+        elif token[0].isdigit():
+            if len(token) == 3 and token.isdigit():
+                if follows == COMMA:
+                    tokens.append(subject + ' ' + token)
+                    follows = CODE
+                else:
+                    follows = None
+            elif token[-1].isalpha():
+                # "-level" or "units" ends a run like any other word
+                follows = None
+                one = False
+            # Decimals and other numbers are not tokens at all
+        elif token[-1].isdigit():
+            subject = token[:4]
+            tokens.append(subject + ' ' + token[-3:])
+            follows = CODE
+        else:
+            word = token.lower()
+            if word in _WORDS:
+                kind = _WORDS[word]
+                if kind is AND or kind is OR:
+                    tokens.append(kind)
+                    if follows is not None:
+                        follows = COMMA
+                elif kind is None and not tokens:
+                    return []  # "Prerequisite None"
+                else:
+                    follows = None
+                one = kind is ONE_OF
+            else:
+                if one and word == 'of':
+                    tokens.append(ONE_OF)
+                follows = None
+                one = False
+    return tokens
+
+
+def _node(op, children):
+    """Build an and/or node, flattening same-operator children"""
+    flat = []
+    for child in children:
+        if isinstance(child, dict) and op in child:
+            flat.extend(child[op])
+        else:
+            flat.append(child)
+    if len(flat) == 1:
+        return flat[0]
+    return {op: flat}
+
+
+def _parse_group(tokens, pos, one_of=False):
+    """Parse operands and separators until a closing bracket or the end.
+
+    `or` binds tighter than `and`. Commas take the meaning of the last
+    explicit connective in the list ("A, B, or C" is one of three), default
+    to `and`, and always mean `or` inside a "one of" group.
+    """
+    operands = []
+    separators = []
+    last_connective = AND
+    pending = None
+    n = len(tokens)
+
+    while pos < n:
+        token = tokens[pos]
+        pos += 1
+        if token == CLOSE:
+            break
+        if token == OPEN:
+            operand, pos = _parse_group(tokens, pos)
+        elif token == ONE_OF:
+            # "one of" without brackets runs to the end of the clause
+            operand, pos = _parse_group(tokens, pos, one_of=True)
+        elif token in (AND, OR, COMMA):
+            if token != COMMA:
+                last_connective = token
+            # Keep the strongest separator seen between two operands
+            if pending is None or pending == COMMA:
+                pending = token
+            continue
+        else:
+            operand = token
+
+        if operand is None:
+            continue
+        if operands:
+            separators.append(pending or AND)
+        operands.append(operand)
+        pending = None
+
+    if not operands:
+        return None, pos
+    if one_of:
+        return _node(OR, operands), pos
+
+    comma = last_connective
+    conjuncts = []
+    run = [operands[0]]
+    for separator, operand in zip(separators, operands[1:]):
+        if separator == COMMA:
+            separator = comma
+        if separator == OR:
+            run.append(operand)
+        else:
+            conjuncts.append(_node(OR, run))
+            run = [operand]
+    conjuncts.append(_node(OR, run))
+    return _node(AND, conjuncts), pos
+
+
+def parse_prerequisite_expr(text):
+    """Parse a prerequisite clause into an AND/OR expression tree.
+
+    Leaves are course codes; inner nodes are {'and': [...]} or {'or': [...]}.
+    Returns None when the clause names no courses.
+    """
+    if not text:
+        return None
+    tree, _ = _parse_group(tokenize(text), 0)
+    return tree
+
+
+def flatten(tree):
+    """Every course code in `tree`, in order of first appearance"""
+    codes = []
+    seen = set()
+    stack = [tree] if tree is not None else []
+    while stack:
+        node = stack.pop()
+        if isinstance(node, str):
+            if node not in seen:
+                seen.add(node)
+                codes.append(node)
+        else:
+            children = node.get(AND) or node.get(OR)
+            stack.extend(reversed(children))
+    return codes
+
+
+def parse_prerequisites(prereq_text):
+    """Parse prerequisite text to extract course codes"""
+    return flatten(parse_prerequisite_expr(prereq_text))
+
+
+def restrict(tree, keep):
+    """`tree` with the course codes for which `keep(code)` is false counted as met.
+
+    Such codes drop out of an `and` and satisfy their `or`; groups left with
+    one operand collapse into it. None when nothing is left to require.
+    """
+    if tree is None:
+        return None
+    if isinstance(tree, str):
+        return tree if keep(tree) else None
+    op = AND if AND in tree else OR
+    children = [restrict(child, keep) for child in tree[op]]
+    if op == OR and None in children:
+        return None
+    children = [child for child in children if child is not None]
+    if not children:
+        return None
+    return _node(op, children)
+
+
+def satisfied(tree, completed):
+    """True if the courses in `completed` meet the requirement `tree`.
+
+    `and` stops at the first unmet branch and `or` at the first met one.
+    """
+    if tree is None:
+        return True
+    if isinstance(tree, str):
+        return tree in completed
+    if AND in tree:
+        return all(satisfied(child, completed) for child in tree[AND])
+    return any(satisfied(child, completed) for child in tree[OR])
+
+
+def benchmark(count=50000, seed=0):
+    """Time parsing `count` synthetic prerequisite clauses"""
+    rng = random.Random(seed)
+    subjects = ['MATH', 'STAT', 'CISC', 'PHYS', 'CHEM', 'ECON']
+    templates = [
+        'Prerequisite {0}.',
+        'Prerequisite {0} and {1}.',
+        'Prerequisites: ({0} or {1}) and {2}; or permission of the department.',
+        'Prerequisite One of {0}, {1}, {2}.',
+        'Prerequisite A grade of C- in {0}, {1}, or {2}.',
+        'Prerequisite Level 3 or above and {0}/{1}.',
+        'Prerequisite None.',
+    ]
+
+    def code():
+        return f'{rng.choice(subjects)} {rng.randint(100, 499)}'
+
+    texts = [rng.choice(templates).format(code(), code(), code()) for _ in range(count)]
+    start = time.perf_counter()
+    for text in texts:
+        parse_prerequisite_expr(text)
+    elapsed = time.perf_counter() - start
+    print(f"Parsed {count} prerequisite clauses in {elapsed:.3f} s "
+          f"({elapsed / count * 1e6:.1f} us each)")
+    return elapsed
+
+
+if __name__ == '__main__':
+    benchmark()
@@ -1,6 +1,14 @@
-import re
+import argparse
+import hashlib
 import json
-from collections import defaultdict
+import os
+import re
+import time
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from html.parser import HTMLParser
+
+from metrics import add_metrics_arguments, instrumented
+from prerequisites import flatten, parse_prerequisite_expr
 
 # Sample course data from the HTML - we'll parse the actual structure
 def parse_course_code(text):
@@ -20,60 +28,102 @@ def parse_units(text):
         return float(match.group(1))
     return 3.0  # default
 
-def parse_prerequisites(prereq_text):
-    """Parse prerequisite text to extract course codes"""
-    if not prereq_text:
-        return []
-    
-    # Clean up the text
-    prereq_text = prereq_text.lower()
-    
-    # If it says "None" or "Prerequisite None", no prerequisites
-    if re.search(r'prerequisite\s*none', prereq_text, re.IGNORECASE):
-        return []
-    
-    # Find all course codes in the prerequisite text
-    # Pattern: MATH 110, CISC 121, etc.
-    course_pattern = r'([A-Z]{4})\s*(\d{3})'
-    matches = re.findall(course_pattern, prereq_text.upper())
-    
-    # Extract unique course codes
-    prereqs = list(set([f"{dept} {num}" for dept, num in matches]))
-    
-    return prereqs
-
-def extract_courses_from_text(text, subject):
-    """Extract course information from course description text"""
+def extract_courses_from_text(text, subject, counters=None):
+    """Extract course information from course description text
+
+    If given, `counters` (a dict) accumulates the regex matches: course
+    headers found, headers of other subjects skipped, and prerequisite
+    clauses with the course codes found in them.
+    """
     courses = []
-    
-    # Split by course entries - look for patterns like "MATH 110" or "CISC 121"
-    # This is a simplified parser - in real implementation we'd use BeautifulSoup
-    
-    course_pattern = r'([A-Z]{4})\s+(\d{3})(?:/(\d+\.\d+))?\s+([^\n]+?)(?=(?:[A-Z]{4}\s+\d{3})|$)'
-    
-    for match in re.finditer(course_pattern, text):
+
+    # Each course entry starts on its own line with a header like
+    # "MATH 110  Linear Algebra  Units: 6.00" (or "MATH 110/6.0 Linear Algebra")
+    course_pattern = r'^([A-Z]{4})\s+(\d{3})(?:/(\d+\.\d+))?\s+(.+)$'
+    headers = list(re.finditer(course_pattern, text, re.MULTILINE))
+    if counters is not None:
+        counters['header_matches'] = counters.get('header_matches', 0) + len(headers)
+
+    for k, match in enumerate(headers):
         dept = match.group(1)
         number = match.group(2)
-        units = float(match.group(3)) if match.group(3) else 3.0
-        description = match.group(4)
-        
+        if dept != subject:
+            if counters is not None:
+                counters['headers_skipped'] = counters.get('headers_skipped', 0) + 1
+            continue
+
+        end = headers[k + 1].start() if k + 1 < len(headers) else len(text)
+        body = text[match.end():end]
+        header = match.group(4)
+
+        units = float(match.group(3)) if match.group(3) else parse_units(header + body)
+        name = re.split(r'\s*Units?:', header)[0].strip()
+
         code = f"{dept} {number}"
-        
+        # The prerequisite clause runs until the next requirement keyword
+        prereq_match = re.search(
+            r'Prerequisites?\b.*?(?=Corequisite|Exclusion|Recommendation|Equivalency|Note|$)',
+            body, re.MULTILINE)
+        requirements = parse_prerequisite_expr(prereq_match.group(0)) if prereq_match else None
+        if counters is not None and prereq_match:
+            counters['prerequisite_clauses'] = counters.get('prerequisite_clauses', 0) + 1
+            counters['prerequisite_codes'] = counters.get('prerequisite_codes', 0) + len(flatten(requirements))
+
         courses.append({
             'code': code,
-            'name': description[:50].strip(),  # Simplified
+            'name': name,
             'units': units,
+            'prerequisites': [p for p in flatten(requirements) if p != code],
+            'requirements': requirements,
             'subject': dept,
             'level': int(number[0]) * 100
         })
-    
+
     return courses
 
+
+class _TextExtractor(HTMLParser):
+    """Flatten calendar HTML to text, one line per block element"""
+
+    BLOCK_TAGS = {'p', 'div', 'br', 'li', 'tr', 'h1', 'h2', 'h3', 'h4', 'span'}
+
+    def __init__(self):
+        super().__init__()
+        self.parts = []
+
+    def handle_starttag(self, tag, attrs):
+        if tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_endtag(self, tag):
+        if tag in self.BLOCK_TAGS:
+            self.parts.append('\n')
+
+    def handle_data(self, data):
+        self.parts.append(data)
+
+
+def html_to_text(html):
+    extractor = _TextExtractor()
+    extractor.feed(html)
+    text = ''.join(extractor.parts).replace('\xa0', ' ')
+    lines = (' '.join(line.split()) for line in text.splitlines())
+    return '\n'.join(line for line in lines if line)
+
+
+def parse_subject_file(path, counters=None):
+    """Parse one saved calendar page (HTML or plain text) into course dicts"""
+    subject = os.path.splitext(os.path.basename(path))[0].upper()
+    with open(path, 'r', encoding='utf-8') as f:
+        text = f.read()
+    if path.endswith(('.html', '.htm')):
+        text = html_to_text(text)
+    return subject, extract_courses_from_text(text, subject, counters)
+
+
 # Manually create course data based on what we fetched
 # This is the real data structure we'll use
 
-courses_data = []
-
 # MATH courses (sample from fetched data)
 math_courses = [
     {'code': 'MATH 110', 'name': 'Linear Algebra', 'units': 6.0, 'prerequisites': [], 'subject': 'MATH', 'level': 100},
@@ -182,39 +232,179 @@ cisc_courses = [
     {'code': 'CISC 499', 'name': 'Undergraduate Project', 'units': 3.0, 'prerequisites': [], 'subject': 'CISC', 'level': 400},
 ]
 
-# Combine all courses
-all_courses = math_courses + stat_courses + cisc_courses
-
-# Save to JSON
-output = {
-    'courses': all_courses,
-    'metadata': {
-        'total_courses': len(all_courses),
-        'math_courses': len(math_courses),
-        'stat_courses': len(stat_courses),
-        'cisc_courses': len(cisc_courses),
-        'source': 'Queen\'s University Academic Calendar 2025-2026'
+DATA_DIR = '/home/claude/data'
+CALENDAR_EXTENSIONS = ('.html', '.htm', '.txt')
+# Bump when the parser output changes so cached subjects are re-parsed
+CACHE_VERSION = 2
+
+
+def file_sha1(path):
+    digest = hashlib.sha1()
+    with open(path, 'rb') as f:
+        for chunk in iter(lambda: f.read(1 << 16), b''):
+            digest.update(chunk)
+    return digest.hexdigest()
+
+
+def _cache_path(cache_dir, path):
+    return os.path.join(cache_dir, os.path.basename(path) + '.json')
+
+
+def load_cached(cache_dir, path):
+    """Cached courses for `path`, or None if the file changed since it was parsed.
+
+    An unchanged mtime is trusted as-is; otherwise the file is hashed, so a
+    touched but identical file is still a hit.
+    """
+    try:
+        with open(_cache_path(cache_dir, path), 'r') as f:
+            entry = json.load(f)
+    except (FileNotFoundError, ValueError):
+        return None
+    if entry.get('version') != CACHE_VERSION:
+        return None
+    mtime = os.stat(path).st_mtime
+    if entry['mtime'] != mtime:
+        if entry['sha1'] != file_sha1(path):
+            return None
+        entry['mtime'] = mtime
+        save_cached(cache_dir, path, entry)
+    return entry
+
+
+def save_cached(cache_dir, path, entry):
+    with open(_cache_path(cache_dir, path), 'w') as f:
+        json.dump(entry, f)
+
+
+def ingest_subject(path):
+    """Worker: parse one subject file, timing it and counting regex matches"""
+    start = time.perf_counter()
+    counters = {}
+    subject, courses = parse_subject_file(path, counters)
+    return {
+        'version': CACHE_VERSION,
+        'path': path,
+        'subject': subject,
+        'courses': courses,
+        'mtime': os.stat(path).st_mtime,
+        'sha1': file_sha1(path),
+        'seconds': time.perf_counter() - start,
+        'counters': counters,
+    }
+
+
+def ingest_calendar(calendar_dir, cache_dir=None, workers=None, metrics=None):
+    """Parse every subject file in `calendar_dir`, one subject per process.
+
+    Subjects whose file is unchanged since the last run are read from
+    `cache_dir` (default: `<calendar_dir>/.cache`) instead of being re-parsed.
+    Returns {subject: [course, ...]} in file name order. Parse counts and
+    times are added to `metrics` if given (cached subjects report the
+    counts from when they were parsed).
+    """
+    if cache_dir is None:
+        cache_dir = os.path.join(calendar_dir, '.cache')
+    os.makedirs(cache_dir, exist_ok=True)
+
+    paths = sorted(
+        os.path.join(calendar_dir, name) for name in os.listdir(calendar_dir)
+        if name.endswith(CALENDAR_EXTENSIONS)
+    )
+
+    results = {}
+    pending = []
+    for path in paths:
+        entry = load_cached(cache_dir, path)
+        if entry is None:
+            pending.append(path)
+        else:
+            results[path] = entry
+            print(f"  {entry['subject']}: {len(entry['courses'])} courses (cached)")
+
+    start = time.perf_counter()
+    if pending:
+        with ProcessPoolExecutor(max_workers=workers) as pool:
+            futures = [pool.submit(ingest_subject, path) for path in pending]
+            for done, future in enumerate(as_completed(futures), 1):
+                entry = future.result()
+                save_cached(cache_dir, entry['path'], entry)
+                results[entry['path']] = entry
+                print(f"  [{done}/{len(pending)}] {entry['subject']}: "
+                      f"{len(entry['courses'])} courses in {entry['seconds'] * 1000:.1f} ms")
+
+    print(f"Parsed {len(pending)} subject(s), {len(paths) - len(pending)} cached, "
+          f"in {time.perf_counter() - start:.2f} s")
+
+    subjects = {}
+    for path in paths:
+        entry = results[path]
+        subjects.setdefault(entry['subject'], []).extend(entry['courses'])
+
+    if metrics is not None:
+        metrics.count('subject_files', len(paths))
+        metrics.count('subject_files_cached', len(paths) - len(pending))
+        for path in pending:
+            metrics.count('parse_seconds', results[path]['seconds'])
+        for entry in results.values():
+            for name, value in entry.get('counters', {}).items():
+                metrics.count(name, value)
+    return subjects
+
+
+def write_courses(subjects, path):
+    all_courses = [course for courses in subjects.values() for course in courses]
+    metadata = {'total_courses': len(all_courses)}
+    for subject, courses in subjects.items():
+        metadata[f'{subject.lower()}_courses'] = len(courses)
+    metadata['source'] = 'Queen\'s University Academic Calendar 2025-2026'
+
+    output = {
+        'courses': all_courses,
+        'metadata': metadata
     }
-}
-
-with open('/home/claude/data/courses.json', 'w') as f:
-    json.dump(output, f, indent=2)
-
-print(f"Extracted {len(all_courses)} courses total:")
-print(f"  - MATH: {len(math_courses)} courses")
-print(f"  - STAT: {len(stat_courses)} courses")
-print(f"  - CISC: {len(cisc_courses)} courses")
-print("\nFirst 10 MATH courses:")
-for course in math_courses[:10]:
-    prereqs = ", ".join(course['prerequisites']) if course['prerequisites'] else "None"
-    print(f"  {course['code']}: {course['name']} ({course['units']} units) - Prerequisites: {prereqs}")
-
-print("\nFirst 10 STAT courses:")
-for course in stat_courses[:10]:
-    prereqs = ", ".join(course['prerequisites']) if course['prerequisites'] else "None"
-    print(f"  {course['code']}: {course['name']} ({course['units']} units) - Prerequisites: {prereqs}")
-
-print("\nFirst 10 CISC courses:")
-for course in cisc_courses[:10]:
-    prereqs = ", ".join(course['prerequisites']) if course['prerequisites'] else "None"
-    print(f"  {course['code']}: {course['name']} ({course['units']} units) - Prerequisites: {prereqs}")
+
+    with open(path, 'w') as f:
+        json.dump(output, f, indent=2)
+    return all_courses
+
+
+def print_samples(subjects):
+    print(f"Extracted {sum(len(c) for c in subjects.values())} courses total:")
+    for subject, courses in subjects.items():
+        print(f"  - {subject}: {len(courses)} courses")
+    for subject, courses in subjects.items():
+        print(f"\nFirst 10 {subject} courses:")
+        for course in courses[:10]:
+            prereqs = ", ".join(course['prerequisites']) if course['prerequisites'] else "None"
+            print(f"  {course['code']}: {course['name']} ({course['units']} units) - Prerequisites: {prereqs}")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Extract course data into courses.json')
+    parser.add_argument('--calendar-dir',
+                        help='directory of saved calendar pages, one <subject>.html/.txt per subject; '
+                             'without it the built-in MATH/STAT/CISC data is written')
+    parser.add_argument('--cache-dir', help='parse cache (default: <calendar-dir>/.cache)')
+    parser.add_argument('--workers', type=int, help='worker processes (default: one per CPU)')
+    parser.add_argument('--output', default=f'{DATA_DIR}/courses.json',
+                        help=f'courses.json to write (default: {DATA_DIR}/courses.json)')
+    add_metrics_arguments(parser)
+    args = parser.parse_args(argv)
+
+    with instrumented('scraper', args) as metrics:
+        with metrics.stage('ingest'):
+            if args.calendar_dir:
+                subjects = ingest_calendar(args.calendar_dir, args.cache_dir, args.workers, metrics)
+            else:
+                subjects = {'MATH': math_courses, 'STAT': stat_courses, 'CISC': cisc_courses}
+        with metrics.stage('write'):
+            courses = write_courses(subjects, args.output)
+        metrics.count('subjects', len(subjects))
+        metrics.count('courses', len(courses))
+        metrics.count('prerequisites', sum(len(course['prerequisites']) for course in courses))
+        print_samples(subjects)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,327 @@
+import argparse
+import json
+import random
+import re
+import time
+from bisect import bisect_left
+from collections import Counter, OrderedDict, defaultdict
+from itertools import accumulate
+
+_WORD = re.compile(r'[a-z0-9]+')
+
+
+def tokenize(text):
+    """Lower-case alphanumeric words: 'MATH 110: Linear Algebra' -> math, 110, linear, algebra"""
+    return _WORD.findall(text.lower())
+
+
+def node_terms(node):
+    """Searchable terms of a graph.json node: code parts, compact id, name words and subject"""
+    terms = set(tokenize(node['code']))
+    terms.add(node['id'].lower())
+    terms.update(tokenize(node['fullName']))
+    terms.add(node['subject'].lower())
+    return terms
+
+
+def rank_key(node):
+    """Static rank order: more follow-ups first, then lower levels, then code"""
+    return -node['followupCount'], node['level'], node['code']
+
+
+def trigrams(term):
+    padded = f'^{term}$'
+    return {padded[i:i + 3] for i in range(len(padded) - 2)}
+
+
+class SearchIndex:
+    """Inverted index for typeahead search over course codes, names and subjects.
+
+    Courses are numbered by static rank (more follow-ups first, then lower
+    levels), so every posting list sorted by number is already in ranking
+    order and the best matches are simply the first ones. Each query word
+    matches indexed terms exactly, by prefix, or failing both by trigram
+    similarity (typos); a course must match every word. Results put
+    courses with more exact word matches first, then follow static rank.
+
+    Only the sorted term list and its postings are stored; the prefix table
+    for short prefixes and the trigram table are rebuilt on load, here and
+    in index.html.
+    """
+
+    # Prefixes up to this length map straight to their postings; longer
+    # ones scan the narrow range of matching terms
+    PREFIX_TABLE = 3
+    # Minimum trigram Dice coefficient for a fuzzy term match
+    MIN_SIMILARITY = 0.4
+    # Query words whose match sets are kept; typeahead repeats all but the last word
+    WORD_CACHE = 256
+
+    def __init__(self, ids, terms, postings):
+        self.ids = ids
+        self.terms = terms
+        self.postings = postings
+        self.term_index = {term: k for k, term in enumerate(terms)}
+
+        prefixes = defaultdict(set)
+        grams = defaultdict(list)
+        self.gram_counts = []
+        for k, term in enumerate(terms):
+            for length in range(1, min(len(term), self.PREFIX_TABLE) + 1):
+                prefixes[term[:length]].update(postings[k])
+            term_grams = trigrams(term)
+            for gram in term_grams:
+                grams[gram].append(k)
+            self.gram_counts.append(len(term_grams))
+        self.prefixes = {prefix: sorted(docs) for prefix, docs in prefixes.items()}
+        self.trigrams = dict(grams)
+        self.word_sets = OrderedDict()
+
+    @classmethod
+    def build(cls, nodes):
+        """Index over graph.json node dicts"""
+        order = sorted(range(len(nodes)), key=lambda i: rank_key(nodes[i]))
+        postings = defaultdict(list)
+        for rank, i in enumerate(order):
+            for term in node_terms(nodes[i]):
+                postings[term].append(rank)
+        terms = sorted(postings)
+        return cls([nodes[i]['id'] for i in order], terms, [postings[term] for term in terms])
+
+    def _fuzzy(self, word):
+        grams = trigrams(word)
+        shared = Counter(k for gram in grams for k in self.trigrams.get(gram, ()))
+        docs = set()
+        for k, count in shared.items():
+            if 2 * count / (len(grams) + self.gram_counts[k]) >= self.MIN_SIMILARITY:
+                docs.update(self.postings[k])
+        return sorted(docs)
+
+    def match(self, word):
+        """(exact, all) rank-ordered courses matching one query word"""
+        k = self.term_index.get(word)
+        exact = self.postings[k] if k is not None else []
+        if len(word) <= self.PREFIX_TABLE:
+            docs = self.prefixes.get(word, [])
+        else:
+            lo = bisect_left(self.terms, word)
+            hi = bisect_left(self.terms, word + '{', lo)  # '{' sorts after [a-z0-9]
+            if hi - lo == 1:
+                docs = self.postings[lo]
+            else:
+                docs = sorted(set().union(*self.postings[lo:hi]))
+        if not docs and len(word) >= 3:
+            docs = self._fuzzy(word)
+        return exact, docs
+
+    def _match_sets(self, word):
+        """(exact set, all set, all in rank order) for one query word, cached"""
+        sets = self.word_sets.get(word)
+        if sets is None:
+            exact, docs = self.match(word)
+            sets = (set(exact), set(docs), docs)
+            self.word_sets[word] = sets
+            if len(self.word_sets) > self.WORD_CACHE:
+                self.word_sets.popitem(last=False)
+        else:
+            self.word_sets.move_to_end(word)
+        return sets
+
+    def search(self, query, limit=20):
+        """Node ids matching every word of `query`, best first (all of them if `limit` is None)"""
+        words = list(dict.fromkeys(tokenize(query)))
+        if not words:
+            return []
+        if len(words) == 1:
+            exact, docs = self.match(words[0])
+            if exact:
+                exact_set = set(exact)
+                ranked = exact + [d for d in docs if d not in exact_set]
+            else:
+                ranked = docs
+        else:
+            matches = [self._match_sets(word) for word in words]
+            sets = sorted((docs for _, docs, _ in matches), key=len)
+            candidates = sets[0].intersection(*sets[1:])
+            # Walk the shortest match list in rank order, filing each candidate
+            # under its number of exact word matches; every bucket stays in rank
+            # order, so nothing is sorted and the walk ends as soon as the best
+            # bucket is full or every candidate is filed
+            exact_sets = [exact for exact, _, _ in matches if exact]
+            buckets = [[] for _ in range(len(exact_sets) + 1)]
+            best = buckets[-1]
+            left = len(candidates)
+            walk = min((docs for _, _, docs in matches), key=len) if candidates else []
+            for d in walk:
+                if d in candidates:
+                    buckets[sum(d in exact for exact in exact_sets)].append(d)
+                    left -= 1
+                    if not left or len(best) == limit:
+                        break
+            ranked = [d for bucket in reversed(buckets) for d in bucket]
+
+        if limit is not None:
+            ranked = ranked[:limit]
+        return [self.ids[d] for d in ranked]
+
+    def to_dict(self):
+        # Postings are stored as gaps between ranks, which keeps numbers short
+        return {
+            'ids': self.ids,
+            'terms': self.terms,
+            'postings': [[d - p for p, d in zip([0] + docs, docs)] for docs in self.postings],
+        }
+
+    @classmethod
+    def from_dict(cls, data):
+        postings = []
+        for gaps in data['postings']:
+            docs = []
+            d = 0
+            for gap in gaps:
+                d += gap
+                docs.append(d)
+            postings.append(docs)
+        return cls(data['ids'], data['terms'], postings)
+
+    def save(self, path):
+        save_index(self.to_dict(), path)
+
+    @classmethod
+    def load(cls, path):
+        with open(path, 'r') as f:
+            return cls.from_dict(json.load(f))
+
+
+def save_index(data, path):
+    with open(path, 'w') as f:
+        f.write(json.dumps(data, separators=(',', ':')))
+
+
+def patch_search(data, nodes, removed, rank_of):
+    """Update a search_index.json document (SearchIndex.to_dict) after an incremental build.
+
+    `nodes` are the new node dicts of every course that was added or
+    changed or whose follow-up count changed, `removed` the ids of removed
+    courses and `rank_of(node_id)` the rank_key of any other course. Those
+    courses are taken out of the rank order and inserted again at their
+    new place; ranks above the first change keep their numbers, so only
+    postings reaching past it are decoded and renumbered.
+    """
+    old_ids = data['ids']
+    old_rank = {node_id: r for r, node_id in enumerate(old_ids)}
+    moving = {node['id'] for node in nodes} | set(removed)
+    ids = [node_id for node_id in old_ids if node_id not in moving]
+    for node in sorted(nodes, key=rank_key):
+        key = rank_key(node)
+        ids.insert(bisect_left(ids, key, key=rank_of), node['id'])
+
+    new_rank = {node_id: r for r, node_id in enumerate(ids)}
+    lo = min([old_rank[i] for i in moving if i in old_rank] +
+             [new_rank[node['id']] for node in nodes], default=len(ids))
+    # Past the last change every rank moves by the same amount
+    shift = len(ids) - len(old_ids)
+    hi = max([old_rank[i] for i in moving if i in old_rank] +
+             [new_rank[node['id']] - shift for node in nodes], default=lo)
+    renumber = [None if node_id in moving else new_rank[node_id] for node_id in old_ids[lo:hi + 1]]
+
+    additions = defaultdict(list)
+    for node in nodes:
+        for term in node_terms(node):
+            additions[term].append(new_rank[node['id']])
+
+    postings = {}
+    for term, gaps in zip(data['terms'], data['postings']):
+        add = additions.pop(term, None)
+        if add is None and sum(gaps) < lo:
+            postings[term] = gaps
+            continue
+        if add is None and gaps[0] > hi:
+            postings[term] = [gaps[0] + shift] + gaps[1:] if shift else gaps
+            continue
+        docs = [d if d < lo else renumber[d - lo] if d <= hi else d + shift for d in accumulate(gaps)]
+        docs = [d for d in docs if d is not None]
+        if add:
+            docs = sorted(docs + add)
+        if docs:
+            postings[term] = [d - p for p, d in zip([0] + docs, docs)]
+    for term, docs in additions.items():
+        docs.sort()
+        postings[term] = [d - p for p, d in zip([0] + docs, docs)]
+
+    terms = sorted(postings)
+    return {'ids': ids, 'terms': terms, 'postings': [postings[term] for term in terms]}
+
+
+_WORDS = ('linear algebra calculus analysis topology geometry number theory statistics probability '
+          'computing systems software design data structures algorithms networks security logic '
+          'differential equations graph optimization inference regression learning introduction '
+          'advanced topics methods applied discrete numerical abstract modern').split()
+
+
+def synthetic_nodes(count, seed=0):
+    """Random graph.json-style nodes for benchmarking large catalogues"""
+    rng = random.Random(seed)
+    subjects = sorted({''.join(rng.choice('ABCDEFGHIJKLMNOPQRSTUVWXYZ') for _ in range(4))
+                       for _ in range(max(1, count // 300))})
+    nodes = []
+    for i in range(count):
+        subject = subjects[i % len(subjects)]
+        number = 100 + i // len(subjects)
+        code = f'{subject} {number}'
+        nodes.append({
+            'id': code.replace(' ', ''),
+            'code': code,
+            'fullName': ' '.join(rng.sample(_WORDS, rng.randint(1, 4))).title(),
+            'subject': subject,
+            'level': number // 100 * 100,
+            'followupCount': rng.randint(0, 12),
+        })
+    return nodes
+
+
+def benchmark(index, queries=200, seed=0):
+    """Time every keystroke of typing random course codes and name words"""
+    rng = random.Random(seed)
+    typed = []
+    for _ in range(queries):
+        node_id = rng.choice(index.ids)
+        text = rng.choice([node_id, node_id[:4] + ' ' + node_id[4:], rng.choice(_WORDS)])
+        typed.extend(text[:k] for k in range(1, len(text) + 1))
+
+    timings = []
+    for query in typed:
+        start = time.perf_counter()
+        index.search(query)
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    print(f"{len(typed)} keystrokes over {len(index.ids)} courses:")
+    print(f"  mean {sum(timings) / len(timings) * 1000:.3f} ms, "
+          f"p99 {timings[int(0.99 * len(timings))] * 1000:.3f} ms, max {timings[-1] * 1000:.3f} ms")
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Search courses by code, name or subject')
+    parser.add_argument('query', nargs='?', help="search text, e.g. 'lin alg' or 'MATH 11'")
+    parser.add_argument('--index', default='search_index.json', help='search index written by build_graph.py')
+    parser.add_argument('--limit', type=int, default=10, help='maximum results (default: 10)')
+    parser.add_argument('--benchmark', type=int, metavar='COURSES',
+                        help='time typeahead over a synthetic catalogue of this many courses')
+    args = parser.parse_args(argv)
+
+    if args.benchmark:
+        start = time.perf_counter()
+        index = SearchIndex.build(synthetic_nodes(args.benchmark))
+        print(f"Index built in {time.perf_counter() - start:.2f} s")
+        benchmark(index)
+        return
+    if not args.query:
+        parser.error('a query or --benchmark is required')
+
+    index = SearchIndex.load(args.index)
+    for node_id in index.search(args.query, args.limit):
+        print(node_id)
+
+
+if __name__ == '__main__':
+    main()
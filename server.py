@@ -0,0 +1,394 @@
+import argparse
+import asyncio
+import gzip
+import hashlib
+import json
+import os
+import random
+import time
+from collections import OrderedDict, defaultdict
+from urllib.parse import parse_qs, unquote, urlsplit
+
+from closure import ClosureIndex
+from course_graph import CourseGraph
+from search_index import SearchIndex
+
+# Compact separators; responses are for machines
+_encoder = json.JSONEncoder(separators=(',', ':'))
+
+# Bodies smaller than this are not worth compressing
+GZIP_MIN_BYTES = 512
+
+_REASONS = {
+    200: 'OK',
+    304: 'Not Modified',
+    400: 'Bad Request',
+    404: 'Not Found',
+    405: 'Method Not Allowed',
+}
+
+
+class GraphService:
+    """Subgraph queries over a graph.json loaded once at startup.
+
+    Every query returns only the nodes it is about plus the prerequisite
+    edges between them, in the graph.json node/edge format, so a page can
+    fetch one neighbourhood at a time instead of the whole catalogue.
+    """
+
+    def __init__(self, data, closure=None, search=None):
+        self.nodes = data['nodes']
+        self.graph = CourseGraph(self.nodes)
+        self.lookup = dict(self.graph.index)
+        self.lookup.update((node_id, i) for i, node_id in enumerate(self.graph.ids))
+        self.by_subject = defaultdict(list)
+        for i, node in enumerate(self.nodes):
+            self.by_subject[node['subject']].append(i)
+        # A stale graph_index.json (other courses or order) is rebuilt
+        if closure is None or closure.ids != self.graph.ids:
+            closure = ClosureIndex.build(self.graph)
+        self.closure = closure
+        if search is None or set(search.ids) != set(self.graph.ids):
+            search = SearchIndex.build(self.nodes)
+        self.search_index = search
+
+    @classmethod
+    def load(cls, graph_path, index_path=None, search_path=None):
+        """Service over a graph.json (and optional graph_index.json and
+        search_index.json) from build_graph.py"""
+        with open(graph_path, 'r') as f:
+            data = json.load(f)
+        closure = None
+        if index_path and os.path.exists(index_path):
+            closure = ClosureIndex.load(index_path)
+        search = None
+        if search_path and os.path.exists(search_path):
+            search = SearchIndex.load(search_path)
+        return cls(data, closure, search)
+
+    def resolve(self, code):
+        """Graph index for 'MATH 110', 'MATH110' or 'math110', or None"""
+        i = self.lookup.get(code)
+        if i is None:
+            i = self.lookup.get(code.upper().replace(' ', ''))
+        return i
+
+    def subgraph(self, members):
+        """Nodes `members` (graph indexes, in order) and the edges among them"""
+        graph = self.graph
+        inside = set(members)
+        ids = graph.ids
+        edges = [
+            {'source': ids[i], 'target': ids[t], 'type': 'prerequisite'}
+            for i in members
+            for t in graph.followups(i)
+            if t in inside
+        ]
+        return {'nodes': [self.nodes[i] for i in members], 'edges': edges}
+
+    def course(self, code):
+        """A course with its direct prerequisites and follow-ups, or None"""
+        i = self.resolve(code)
+        if i is None:
+            return None
+        prereqs = list(self.graph.prerequisites(i))
+        followups = list(self.graph.followups(i))
+        members = list(dict.fromkeys([i] + prereqs + followups))
+        result = {'course': self.graph.ids[i]}
+        result.update(self.subgraph(members))
+        return result
+
+    def ancestors(self, code):
+        """A course and every direct or indirect prerequisite, or None"""
+        i = self.resolve(code)
+        if i is None:
+            return None
+        members = [i] + [j for j in self.closure.ancestors[i] if j != i]
+        result = {'course': self.graph.ids[i], 'depth': self.closure.depth[i]}
+        result.update(self.subgraph(members))
+        return result
+
+    def descendants(self, code):
+        """A course and every course it eventually unlocks, or None"""
+        i = self.resolve(code)
+        if i is None:
+            return None
+        members = [i] + [j for j in self.closure.descendants[i] if j != i]
+        result = {'course': self.graph.ids[i]}
+        result.update(self.subgraph(members))
+        return result
+
+    def subject(self, subject):
+        """Every course in a subject and the edges within it, or None"""
+        members = self.by_subject.get(subject.upper())
+        if members is None:
+            return None
+        result = {'subject': subject.upper()}
+        result.update(self.subgraph(members))
+        return result
+
+    def search(self, query, limit=20):
+        """Courses matching every word of `query` by code, name or subject, best first"""
+        ids = self.search_index.search(query, limit)
+        return {'query': query, 'nodes': [self.nodes[self.lookup[node_id]] for node_id in ids]}
+
+
+class _CachedResponse:
+    __slots__ = ('body', 'gzipped', 'etag', 'size')
+
+    def __init__(self, body):
+        self.body = body
+        self.gzipped = gzip.compress(body, 6) if len(body) >= GZIP_MIN_BYTES else None
+        self.etag = '"' + hashlib.sha1(body).hexdigest()[:20] + '"'
+        self.size = len(body) + len(self.gzipped or b'')
+
+
+class ResponseCache:
+    """LRU of encoded responses, evicting the oldest past `max_bytes` of bodies"""
+
+    def __init__(self, max_bytes):
+        self.max_bytes = max_bytes
+        self.entries = OrderedDict()
+        self.size = 0
+        self.hits = 0
+        self.misses = 0
+
+    def get(self, key):
+        entry = self.entries.get(key)
+        if entry is None:
+            self.misses += 1
+            return None
+        self.entries.move_to_end(key)
+        self.hits += 1
+        return entry
+
+    def put(self, key, entry):
+        if entry.size > self.max_bytes:
+            return
+        old = self.entries.pop(key, None)
+        if old is not None:
+            self.size -= old.size
+        self.entries[key] = entry
+        self.size += entry.size
+        while self.size > self.max_bytes:
+            _, evicted = self.entries.popitem(last=False)
+            self.size -= evicted.size
+
+
+class GraphServer:
+    """HTTP/1.1 front end for a GraphService on asyncio streams.
+
+    Routes (GET or HEAD):
+      /course/{code}              course plus direct prerequisites and follow-ups
+      /course/{code}/ancestors    course plus its full prerequisite chain
+      /course/{code}/descendants  course plus everything it unlocks
+      /subject/{SUBJ}             every course in a subject
+      /search?q=...&limit=N       code/name/subject matches, best first
+    Successful responses are cached by request target, carry an ETag
+    (answered with 304 on If-None-Match) and are gzipped when the client
+    accepts it. Connections are kept alive unless the client asks otherwise.
+    """
+
+    def __init__(self, service, cache_bytes=64 * 1024 * 1024):
+        self.service = service
+        self.cache = ResponseCache(cache_bytes)
+
+    def route(self, target):
+        """(status, payload) for a request target"""
+        url = urlsplit(target)
+        parts = [unquote(part) for part in url.path.strip('/').split('/')]
+        service = self.service
+        result = None
+        if len(parts) == 2 and parts[0] == 'course':
+            result = service.course(parts[1])
+        elif len(parts) == 3 and parts[0] == 'course' and parts[2] == 'ancestors':
+            result = service.ancestors(parts[1])
+        elif len(parts) == 3 and parts[0] == 'course' and parts[2] == 'descendants':
+            result = service.descendants(parts[1])
+        elif len(parts) == 2 and parts[0] == 'subject':
+            result = service.subject(parts[1])
+        elif parts == ['search']:
+            query = parse_qs(url.query)
+            try:
+                limit = int(query.get('limit', ['20'])[0])
+            except ValueError:
+                return 400, {'error': 'limit must be an integer'}
+            result = service.search(query.get('q', [''])[0], max(0, limit))
+        else:
+            return 404, {'error': f'No route for {url.path}'}
+        if result is None:
+            return 404, {'error': f'Not found: {parts[1]}'}
+        return 200, result
+
+    def respond(self, method, target, headers):
+        """Status line, headers and body bytes for one request"""
+        if method not in ('GET', 'HEAD'):
+            return self._message(405, {'error': f'Method {method} not allowed'}, {'Allow': 'GET, HEAD'})
+
+        entry = self.cache.get(target)
+        if entry is None:
+            status, payload = self.route(target)
+            if status != 200:
+                return self._message(status, payload)
+            entry = _CachedResponse(_encoder.encode(payload).encode('utf-8'))
+            self.cache.put(target, entry)
+
+        use_gzip = entry.gzipped is not None and 'gzip' in headers.get('accept-encoding', '')
+        # The compressed representation gets its own validator
+        etag = entry.etag[:-1] + '-gzip"' if use_gzip else entry.etag
+        extra = {'ETag': etag, 'Cache-Control': 'no-cache', 'Vary': 'Accept-Encoding'}
+        if etag in headers.get('if-none-match', ''):
+            return self._head(304, 0, extra), b''
+        if use_gzip:
+            extra['Content-Encoding'] = 'gzip'
+            body = entry.gzipped
+        else:
+            body = entry.body
+        return self._head(200, len(body), extra), body
+
+    def _message(self, status, payload, extra=None):
+        body = _encoder.encode(payload).encode('utf-8')
+        return self._head(status, len(body), extra or {}), body
+
+    def _head(self, status, length, extra):
+        lines = [f'HTTP/1.1 {status} {_REASONS[status]}',
+                 'Content-Type: application/json',
+                 f'Content-Length: {length}',
+                 'Access-Control-Allow-Origin: *']
+        lines += [f'{name}: {value}' for name, value in extra.items()]
+        return ('\r\n'.join(lines) + '\r\n').encode('latin-1')
+
+    async def handle(self, reader, writer):
+        try:
+            while True:
+                request_line = await reader.readline()
+                if not request_line:
+                    break
+                headers = {}
+                while True:
+                    line = await reader.readline()
+                    if line in (b'\r\n', b'\n', b''):
+                        break
+                    name, _, value = line.decode('latin-1').partition(':')
+                    headers[name.strip().lower()] = value.strip()
+
+                parts = request_line.decode('latin-1').split()
+                if len(parts) != 3:
+                    head, body = self._message(400, {'error': 'Malformed request line'})
+                    writer.write(head + b'Connection: close\r\n\r\n' + body)
+                    break
+                method, target, version = parts
+                if headers.get('content-length'):
+                    await reader.readexactly(int(headers['content-length']))
+
+                connection = headers.get('connection', '').lower()
+                keep_alive = connection != 'close' if version == 'HTTP/1.1' else connection == 'keep-alive'
+                head, body = self.respond(method, target, headers)
+                head += b'Connection: keep-alive\r\n\r\n' if keep_alive else b'Connection: close\r\n\r\n'
+                writer.write(head if method == 'HEAD' else head + body)
+                await writer.drain()
+                if not keep_alive:
+                    break
+        except (ConnectionError, asyncio.IncompleteReadError, ValueError):
+            pass
+        finally:
+            writer.close()
+
+    async def start(self, host, port):
+        return await asyncio.start_server(self.handle, host, port)
+
+
+async def _client(host, port, targets, latencies):
+    reader, writer = await asyncio.open_connection(host, port)
+    for target in targets:
+        start = time.perf_counter()
+        writer.write(f'GET {target} HTTP/1.1\r\nHost: {host}\r\nAccept-Encoding: gzip\r\n\r\n'.encode('latin-1'))
+        await writer.drain()
+        length = 0
+        while True:
+            line = await reader.readline()
+            if line == b'\r\n':
+                break
+            if line.lower().startswith(b'content-length:'):
+                length = int(line.split(b':')[1])
+        await reader.readexactly(length)
+        latencies.append(time.perf_counter() - start)
+    writer.close()
+
+
+async def benchmark(server, requests, connections=8):
+    """Fire `requests` mixed queries over keep-alive connections to an in-process server.
+
+    Client and server share one event loop, so the figures include client
+    overhead and are an upper bound on server latency.
+    """
+    listener = await server.start('127.0.0.1', 0)
+    host, port = listener.sockets[0].getsockname()[:2]
+
+    rng = random.Random(0)
+    ids = server.service.graph.ids
+    subjects = sorted(server.service.by_subject)
+    routes = [
+        lambda: f'/course/{rng.choice(ids)}',
+        lambda: f'/course/{rng.choice(ids)}/ancestors',
+        lambda: f'/subject/{rng.choice(subjects)}',
+        lambda: f'/search?q={rng.choice(ids)[:rng.randint(1, 6)]}',
+    ]
+    targets = [rng.choice(routes)() for _ in range(requests)]
+
+    latencies = []
+    start = time.perf_counter()
+    await asyncio.gather(*(
+        _client(host, port, targets[k::connections], latencies) for k in range(connections)
+    ))
+    elapsed = time.perf_counter() - start
+    listener.close()
+    await listener.wait_closed()
+
+    latencies.sort()
+    cache = server.cache
+
+    def percentile(p):
+        return latencies[min(len(latencies) - 1, int(p * len(latencies)))] * 1000
+
+    print(f"{requests} requests over {connections} connections in {elapsed:.2f} s "
+          f"({requests / elapsed:.0f} req/s)")
+    print(f"  p50 {percentile(0.5):.2f} ms, p99 {percentile(0.99):.2f} ms, max {latencies[-1] * 1000:.2f} ms")
+    print(f"  cache: {cache.hits} hits, {cache.misses} misses, {len(cache.entries)} entries, "
+          f"{cache.size / 1024:.0f} KiB")
+
+
+async def serve(server, host, port):
+    listener = await server.start(host, port)
+    print(f"Serving {len(server.service.graph)} courses on http://{host}:{port}")
+    async with listener:
+        await listener.serve_forever()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Serve course subgraph queries over HTTP')
+    parser.add_argument('--graph', default='graph.json', help='graph.json written by build_graph.py')
+    parser.add_argument('--index', default='graph_index.json',
+                        help='closure index written by build_graph.py (rebuilt if missing or stale)')
+    parser.add_argument('--search-index', default='search_index.json',
+                        help='search index written by build_graph.py (rebuilt if missing or stale)')
+    parser.add_argument('--host', default='127.0.0.1', help='interface to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=8000, help='port to listen on (default: 8000)')
+    parser.add_argument('--cache-mb', type=float, default=64, help='response cache size in MB (default: 64)')
+    parser.add_argument('--benchmark', type=int, metavar='REQUESTS',
+                        help='measure latency against an in-process server instead of serving')
+    args = parser.parse_args(argv)
+
+    service = GraphService.load(args.graph, args.index, args.search_index)
+    server = GraphServer(service, int(args.cache_mb * 1024 * 1024))
+    try:
+        if args.benchmark:
+            asyncio.run(benchmark(server, args.benchmark))
+        else:
+            asyncio.run(serve(server, args.host, args.port))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,64 @@
+import pytest
+
+from calendar_store import CalendarStore, synthetic_history
+
+
+def by_code(courses):
+    return sorted(courses, key=lambda course: course['code'])
+
+
+def naive_diff(before, after):
+    old = {course['code']: course for course in before}
+    new = {course['code']: course for course in after}
+    changed = []
+    for code in sorted(old.keys() & new.keys()):
+        if old[code] != new[code]:
+            prereqs_before, prereqs_after = set(old[code]['prerequisites']), set(new[code]['prerequisites'])
+            changed.append({
+                'code': code,
+                'prerequisites': {'added': sorted(prereqs_after - prereqs_before),
+                                  'removed': sorted(prereqs_before - prereqs_after)},
+                'fields': sorted(name for name in old[code].keys() | new[code].keys()
+                                 if name != 'prerequisites' and old[code].get(name) != new[code].get(name)),
+            })
+    return {'added': sorted(new.keys() - old.keys()), 'removed': sorted(old.keys() - new.keys()), 'changed': changed}
+
+
+@pytest.fixture
+def store(tmp_path):
+    history = synthetic_history(400, 4)
+    with CalendarStore(str(tmp_path / 'calendars.db')) as store:
+        for year, courses in enumerate(history, 2020):
+            store.add(year, courses)
+        yield store, history
+
+
+def test_courses_materialise_every_stored_year(store):
+    store, history = store
+    assert store.years() == [2020, 2021, 2022, 2023]
+    for year, courses in enumerate(history, 2020):
+        assert by_code(store.courses(year)) == by_code(courses)
+
+
+def test_diff_matches_comparing_whole_calendars(store):
+    store, history = store
+    for since, year in [(2020, 2021), (2021, 2023), (2020, 2023)]:
+        diff = store.diff(year, since)
+        expected = naive_diff(history[since - 2020], history[year - 2020])
+        assert expected['added'] and expected['removed'] and expected['changed']
+        assert {key: diff[key] for key in ('added', 'removed', 'changed')} == expected
+    assert store.diff(2022)['from'] == 2021
+
+
+def test_change_reverted_between_years_is_not_reported(tmp_path):
+    course = {'code': 'MATH 110', 'name': 'Linear Algebra', 'units': 6.0, 'prerequisites': [],
+              'subject': 'MATH', 'level': 100}
+    with CalendarStore(str(tmp_path / 'calendars.db')) as store:
+        store.add(2020, [course])
+        assert store.add(2021, [dict(course, name='Linear Algebra I')]) == {'added': 0, 'changed': 1, 'removed': 0}
+        store.add(2022, [course])
+        assert store.diff(2022, 2020)['changed'] == []
+        assert [version['name'] for _, _, version in store.history('MATH 110')] == [
+            'Linear Algebra', 'Linear Algebra I', 'Linear Algebra']
+        with pytest.raises(ValueError):
+            store.add(2021, [course])
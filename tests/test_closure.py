@@ -0,0 +1,52 @@
+from closure import ClosureIndex, decode_bits, encode_bits
+from course_graph import CourseGraph
+
+
+def course(code, prerequisites=()):
+    subject, number = code.split()
+    return {'code': code, 'name': code, 'units': 3.0, 'subject': subject, 'level': int(number[0]) * 100,
+            'prerequisites': list(prerequisites)}
+
+
+def chain_graph():
+    # MATH 110 -> MATH 210 -> MATH 310, MATH 120 -> MATH 310, and a MATH 400 <-> MATH 401 cycle below MATH 310
+    return CourseGraph([
+        course('MATH 110'),
+        course('MATH 120'),
+        course('MATH 210', ['MATH 110']),
+        course('MATH 310', ['MATH 210', 'MATH 120']),
+        course('MATH 400', ['MATH 310', 'MATH 401']),
+        course('MATH 401', ['MATH 400']),
+        course('STAT 100'),
+    ])
+
+
+def test_depth_is_the_longest_chain_in_terms():
+    closure = ClosureIndex.build(chain_graph())
+    assert closure.depth == [1, 1, 2, 3, 4, 4, 1]
+    assert closure.ancestor_ids(3) == ['MATH110', 'MATH120', 'MATH210']
+    assert closure.descendant_ids(0) == ['MATH210', 'MATH310', 'MATH400', 'MATH401']
+    assert closure.requires(3, 0) and not closure.requires(0, 3)
+    position = {i: k for k, i in enumerate(closure.order)}
+    assert all(position[p] < position[i] for i in range(4) for p in closure.ancestors[i])
+
+
+def test_cycles_are_reported_and_every_member_requires_every_member():
+    closure = ClosureIndex.build(chain_graph())
+    assert closure.cycles == [[4, 5]]
+    assert closure.requires(4, 5) and closure.requires(5, 4) and closure.requires(4, 4)
+    assert closure.ancestor_ids(5) == ['MATH110', 'MATH120', 'MATH210', 'MATH310', 'MATH400', 'MATH401']
+    assert closure.to_dict()['cycles'] == [['MATH400', 'MATH401']]
+
+
+def test_sets_round_trip_through_graph_index_json():
+    assert encode_bits([3, 40, 200]) == [3, 37, 160]
+    assert encode_bits([0, 1, 2, 5]) == '27'
+    assert encode_bits([]) == '0'
+    for bits in ([3, 40, 200], [0, 1, 2, 5], [], [7, 8, 9, 15, 16]):
+        assert list(decode_bits(encode_bits(bits))) == bits
+
+    closure = ClosureIndex.build(chain_graph())
+    loaded = ClosureIndex.from_dict(closure.to_dict())
+    assert loaded.ancestors == closure.ancestors and loaded.descendants == closure.descendants
+    assert loaded.order == closure.order and loaded.cycles == closure.cycles
@@ -0,0 +1,56 @@
+import json
+
+from build_graph import full_build, load_courses
+from graph_formats import read_binary
+
+
+def build(tmp_path, output_format, courses):
+    data_dir = tmp_path / output_format
+    data_dir.mkdir()
+    full_build(courses, output_format, data_dir=data_dir)
+    return data_dir
+
+
+def read_ndjson(path):
+    """graph.ndjson records back in the graph.json document shape"""
+    document = {'nodes': [], 'edges': [], 'components': {'all': []}}
+    with open(path) as f:
+        for line in f:
+            record = json.loads(line)
+            if 'statistics' in record:
+                document['statistics'] = record['statistics']
+            elif 'node' in record:
+                document['nodes'].append(record['node'])
+            elif 'edge' in record:
+                document['edges'].append(record['edge'])
+            else:
+                document['components']['all'].append(record['component'])
+    return document
+
+
+def test_stream_and_ndjson_hold_the_same_graph_as_json(tmp_path):
+    courses = load_courses('courses.json')
+    expected = json.loads((build(tmp_path, 'json', courses) / 'graph.json').read_text())
+
+    assert json.loads((build(tmp_path, 'stream', courses) / 'graph.json').read_text()) == expected
+
+    document = read_ndjson(build(tmp_path, 'ndjson', courses) / 'graph.ndjson')
+    assert document['components']['all'] == expected['components']['all']
+    del expected['components']['main'], expected['components']['isolated']
+    assert document == expected
+
+
+def test_graph_bin_reads_back_as_graph_json(tmp_path):
+    courses = load_courses('courses.json')
+    data_dir = build(tmp_path, 'json', courses)
+    expected = json.loads((data_dir / 'graph.json').read_text())
+    document = read_binary(data_dir / 'graph.bin')
+
+    assert document['nodes'] == expected['nodes']
+    assert document['edges'] == expected['edges']
+    assert document['statistics'] == expected['statistics']
+    assert document['components']['all'] == expected['components']['all']
+    assert sorted(document['components']['isolated']) == sorted(expected['components']['isolated'])
+    binary = (data_dir / 'graph.bin').read_bytes()
+    for output_format in ('stream', 'ndjson'):
+        assert (build(tmp_path, output_format, courses) / 'graph.bin').read_bytes() == binary
@@ -0,0 +1,77 @@
+import copy
+
+import pytest
+
+from build_graph import full_build, incremental_build, load_courses
+
+OUTPUTS = ['graph.json', 'graph.bin', 'graph_state.json', 'graph_index.json', 'search_index.json']
+
+
+def find(courses, code):
+    return next(course for course in courses if course['code'] == code)
+
+
+def add_course(courses):
+    courses.insert(10, {'code': 'MATH 111', 'name': 'Linear Algebra Topics', 'units': 3.0,
+                        'prerequisites': ['MATH 110'], 'subject': 'MATH', 'level': 100})
+
+
+def remove_prerequisite_course(courses):
+    # MATH 210 is a prerequisite of several courses, which are left dangling
+    courses.remove(find(courses, 'MATH 210'))
+
+
+def edit_name_and_prerequisites(courses):
+    course = find(courses, 'MATH 328')
+    course['name'] = 'Real Analysis II'
+    course['prerequisites'] = ['MATH 225']
+
+
+def join_isolated_course(courses):
+    # Merges an isolated course into the main component
+    find(courses, 'MATH 499')['prerequisites'] = ['MATH 418']
+
+
+def create_cycle(courses):
+    find(courses, 'MATH 210')['prerequisites'] = ['MATH 110', 'MATH 418']
+
+
+def all_edits(courses):
+    for edit in (add_course, remove_prerequisite_course, edit_name_and_prerequisites, join_isolated_course):
+        edit(courses)
+
+
+@pytest.mark.parametrize('edit', [add_course, remove_prerequisite_course, edit_name_and_prerequisites,
+                                  join_isolated_course, create_cycle, all_edits])
+def test_incremental_build_matches_full_build(tmp_path, edit):
+    courses = load_courses('courses.json')
+    incremental_dir = tmp_path / 'incremental'
+    full_dir = tmp_path / 'full'
+    incremental_dir.mkdir()
+    full_dir.mkdir()
+
+    full_build(courses, data_dir=incremental_dir)
+    changed = copy.deepcopy(courses)
+    edit(changed)
+    assert incremental_build(changed, data_dir=incremental_dir)
+    full_build(changed, data_dir=full_dir)
+
+    for name in OUTPUTS:
+        assert (incremental_dir / name).read_bytes() == (full_dir / name).read_bytes(), name
+
+
+def test_edits_one_after_another_match_full_build(tmp_path):
+    courses = load_courses('courses.json')
+    incremental_dir = tmp_path / 'incremental'
+    full_dir = tmp_path / 'full'
+    incremental_dir.mkdir()
+    full_dir.mkdir()
+
+    full_build(courses, data_dir=incremental_dir)
+    for edit in (add_course, join_isolated_course, edit_name_and_prerequisites, remove_prerequisite_course):
+        edit(courses)
+        assert incremental_build(courses, data_dir=incremental_dir)
+    full_build(courses, data_dir=full_dir)
+
+    for name in OUTPUTS:
+        assert (incremental_dir / name).read_bytes() == (full_dir / name).read_bytes(), name
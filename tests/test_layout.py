@@ -0,0 +1,42 @@
+import json
+import re
+
+import pytest
+
+from build_graph import full_build, incremental_build, load_courses
+from graph_formats import read_columns
+
+layout = pytest.importorskip('layout')  # needs NumPy
+
+
+def test_plain_incremental_keeps_the_previous_layout(tmp_path):
+    courses = load_courses('courses.json')[:30]
+    full_build(courses, with_layout=True, data_dir=tmp_path)
+    before = read_columns(tmp_path / 'graph.bin')
+
+    prerequisite = next(course['code'] for course in courses if course['level'] == 100)
+    added = courses + [{'code': 'MATH 499', 'name': 'New Course', 'units': 3.0, 'prerequisites': [prerequisite],
+                        'subject': 'MATH', 'level': 400}]
+    assert incremental_build(added, data_dir=tmp_path)
+
+    after = read_columns(tmp_path / 'graph.bin')
+    assert after['x'] is not None
+    assert list(after['x'][:len(courses)]) == list(before['x'])
+    assert list(after['y'][:len(courses)]) == list(before['y'])
+    with open(tmp_path / 'graph.json') as f:
+        nodes = json.load(f)['nodes']
+    assert all('x' in node and 'y' in node for node in nodes)
+
+
+def test_page_forces_match_the_build_time_layout():
+    with open('index.html') as f:
+        block = re.search(r'const FORCES = \{(.*?)\};', f.read(), re.S).group(1)
+    forces = {name: float(value) for name, value in re.findall(r'(\w+): (-?[\d.]+)', block)}
+    assert forces == {
+        'linkDistance': layout.LINK_DISTANCE,
+        'linkStrength': layout.LINK_STRENGTH,
+        'chargeStrength': layout.CHARGE_STRENGTH,
+        'collisionPadding': layout.COLLISION_PADDING,
+        'centerStrength': layout.CENTER_STRENGTH,
+        'alphaDecay': layout.ALPHA_DECAY,
+    }
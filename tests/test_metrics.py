@@ -0,0 +1,16 @@
+import metrics
+from build_graph import full_build, load_courses
+
+
+def test_stages_cover_the_build_without_resource(tmp_path, monkeypatch):
+    # Windows has no resource module
+    monkeypatch.setattr(metrics, 'resource', None)
+    run = metrics.Metrics('build_graph')
+    full_build(load_courses('courses.json'), data_dir=tmp_path, metrics=run)
+    data = run.to_dict()
+
+    assert data['max_rss_bytes'] is None
+    assert all(stage['max_rss_bytes'] is None for stage in data['stages'])
+    assert data['stages'][-1]['name'] == 'subject_stats'
+    staged = sum(stage['seconds'] for stage in data['stages'])
+    assert staged > 0.8 * data['total_seconds']
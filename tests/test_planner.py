@@ -0,0 +1,22 @@
+import time
+
+from course_graph import CourseGraph
+from planner import DegreePlanner
+
+
+def test_many_interchangeable_courses_fall_back_to_greedy_terms():
+    # No two 6-unit courses share a term, so the 10-term lower bound is out of
+    # reach and the exact search alone would try every way to fill each term
+    units = [3.0] * 4 + [4.0] * 4 + [6.0] * 12
+    courses = [{'code': f'MATH {100 + k}', 'name': f'Course {k}', 'units': u, 'subject': 'MATH', 'level': 100,
+                'prerequisites': []} for k, u in enumerate(units)]
+    planner = DegreePlanner(CourseGraph(courses))
+
+    start = time.perf_counter()
+    terms = planner.plan([course['code'] for course in courses], max_units=10, max_terms=20)
+    assert time.perf_counter() - start < 1
+
+    assert sorted(code for term in terms for code in term) == sorted(course['code'] for course in courses)
+    by_code = {course['code']: course['units'] for course in courses}
+    assert all(sum(by_code[code] for code in term) <= 10 for term in terms)
+    assert len(terms) == 12
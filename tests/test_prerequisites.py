@@ -0,0 +1,21 @@
+from prerequisites import parse_prerequisite_expr, parse_prerequisites
+
+
+def test_bare_number_after_connective_inherits_subject():
+    assert parse_prerequisites('Prerequisite MATH 110 or 111.') == ['MATH 110', 'MATH 111']
+    assert parse_prerequisites('Prerequisite MATH 110, 111, or 112.') == ['MATH 110', 'MATH 111', 'MATH 112']
+    assert parse_prerequisite_expr('Prerequisite MATH 110/111 and STAT 263.') == {
+        'and': [{'or': ['MATH 110', 'MATH 111']}, 'STAT 263']}
+
+
+def test_level_is_not_a_course():
+    assert parse_prerequisites('Prerequisite CISC 124 and 6.00 units in 200-level MATH.') == ['CISC 124']
+    assert parse_prerequisites('Prerequisite STAT 252 or 3.00 units of 300-level STAT.') == ['STAT 252']
+    assert parse_prerequisites('Prerequisite MATH 110 and 300 level MATH.') == ['MATH 110']
+
+
+def test_unit_count_is_not_a_course():
+    text = 'Prerequisite MATH 110 and registration in a program with 120 units.'
+    assert parse_prerequisites(text) == ['MATH 110']
+    assert parse_prerequisites('Prerequisite MATH 110 and 120 units.') == ['MATH 110']
+    assert parse_prerequisites('Prerequisite MATH 110 or 120.0 units.') == ['MATH 110']
@@ -0,0 +1,66 @@
+import numpy as np
+
+from build_graph import load_courses
+from course_graph import CourseGraph, course_node
+from eligibility import EligibilityIndex, naive_eligible_codes
+from planner import DegreePlanner
+
+
+def course(code, units=3.0, requirements=None, prerequisites=()):
+    subject, number = code.split()
+    return {
+        'code': code, 'name': code, 'units': units, 'subject': subject, 'level': int(number[0]) * 100,
+        'prerequisites': list(prerequisites), 'requirements': requirements,
+    }
+
+
+def or_graph():
+    # MATH 300 needs MATH 120 and either MATH 110 or MATH 200 (which itself needs MATH 100)
+    return CourseGraph([
+        course('MATH 100'),
+        course('MATH 110'),
+        course('MATH 120'),
+        course('MATH 200', requirements='MATH 100', prerequisites=['MATH 100']),
+        course('MATH 300', requirements={'and': [{'or': ['MATH 110', 'MATH 200']}, 'MATH 120']},
+               prerequisites=['MATH 110', 'MATH 200', 'MATH 120']),
+        # PHYS 104 is not in the graph, so it satisfies the or on its own
+        course('MATH 310', requirements={'or': ['MATH 200', 'PHYS 104']}, prerequisites=['MATH 200', 'PHYS 104']),
+    ])
+
+
+def test_requirements_count_unknown_courses_as_met():
+    graph = or_graph()
+    assert graph.requirements(4) == {'and': [{'or': ['MATH 110', 'MATH 200']}, 'MATH 120']}
+    assert graph.requirements(5) is None
+    assert CourseGraph([course('MATH 100'), course('MATH 200', prerequisites=['MATH 100'])]).requirements(1) == 'MATH 100'
+
+
+def test_eligibility_takes_either_branch_of_an_or():
+    graph = or_graph()
+    transcripts = [['MATH 110', 'MATH 120'], ['MATH 100', 'MATH 200', 'MATH 120'], ['MATH 110']]
+    eligible = EligibilityIndex(graph).eligible_codes(transcripts)
+    assert ['MATH 300' in codes for codes in eligible] == [True, True, False]
+    assert eligible == naive_eligible_codes(graph, transcripts)
+
+
+def test_thread_pool_matches_a_single_pass():
+    index = EligibilityIndex(CourseGraph(load_courses('courses.json')))
+    # Three chunks of CHUNK_BYTES student bytes, the last one partial
+    width = EligibilityIndex.CHUNK_BYTES * 2 + 100
+    bits = np.random.default_rng(0).integers(0, 256, (len(index.graph), width), dtype=np.uint8)
+    assert (index.eligible_bits(bits, workers=3) == index.eligible_bits(bits)).all()
+
+
+def test_planner_takes_the_shorter_branch_of_an_or():
+    planner = DegreePlanner(or_graph())
+
+    def plan(*args, **kwargs):
+        return [sorted(term) for term in planner.plan(*args, **kwargs)]
+
+    assert plan(['MATH 300']) == [['MATH 110', 'MATH 120'], ['MATH 300']]
+    assert plan(['MATH 300'], completed=['MATH 200']) == [['MATH 120'], ['MATH 300']]
+
+
+def test_nodes_without_a_tree_leave_requirements_out():
+    assert 'requirements' not in course_node(course('MATH 100'), 0)
+    assert course_node(course('MATH 200', requirements='MATH 100'), 0)['requirements'] == 'MATH 100'
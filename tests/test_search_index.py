@@ -0,0 +1,48 @@
+from search_index import SearchIndex
+
+
+def node(code, name, followups):
+    return {'id': code.replace(' ', ''), 'code': code, 'fullName': name, 'subject': code.split()[0],
+            'level': int(code.split()[1][0]) * 100, 'followupCount': followups}
+
+
+def index():
+    return SearchIndex.build([
+        node('MATH 110', 'Linear Algebra', 10),
+        node('MATH 112', 'Introduction to Linear Algebra', 2),
+        node('MATH 212', 'Linear Algebra II', 3),
+        node('MATH 300', 'Linear Algebraic Topics', 20),
+        node('STAT 263', 'Introduction to Statistics', 5),
+        node('CISC 271', 'Linear Data Analysis', 1),
+    ])
+
+
+def test_more_exact_words_rank_first_then_static_rank():
+    search = index()
+    # MATH 300 has the most follow-ups but only matches "algebra" by prefix
+    assert search.search('linear algebra') == ['MATH110', 'MATH212', 'MATH112', 'MATH300']
+    assert search.search('algebra linear') == ['MATH110', 'MATH212', 'MATH112', 'MATH300']
+    assert search.search('lin alg') == ['MATH300', 'MATH110', 'MATH212', 'MATH112']
+    assert search.search('intro lin') == ['MATH112']
+
+
+def test_limit_keeps_the_best_results():
+    search = index()
+    for query in ('linear algebra', 'lin alg', 'linear', 'l a'):
+        everything = search.search(query, limit=None)
+        for limit in (1, 2, 3):
+            assert search.search(query, limit=limit) == everything[:limit]
+
+
+def test_typos_fall_back_to_trigram_matches():
+    search = index()
+    assert search.search('statistcs') == ['STAT263']
+    assert search.search('linear algbra') == ['MATH300', 'MATH110', 'MATH212', 'MATH112']
+    assert search.search('xyzzy') == []
+
+
+def test_index_round_trips_through_search_index_json():
+    search = index()
+    loaded = SearchIndex.from_dict(search.to_dict())
+    for query in ('linear algebra', 'lin alg', 'statistcs', 'math 2'):
+        assert loaded.search(query) == search.search(query)